@@ -5,12 +5,141 @@
 用于处理飞书API的认证功能
 """
 
-import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Tuple, Optional
+
 import requests
-import sys
-from typing import Tuple, Optional
 
-from config import APP_ID, APP_SECRET
+import config
+from http_session import get_session, REQUEST_TIMEOUT
+from json_utils import dumps, dumps_bytes, loads
+
+logger = logging.getLogger(__name__)
+
+# tenant_access_token 缓存，键为(app_id, app_secret)，值为(token, 过期时间点)
+# 过期时间点基于time.monotonic()，不受系统时间调整影响
+_TOKEN_CACHE: Dict[Tuple[str, str], Tuple[str, float]] = {}
+_TOKEN_LOCK = threading.Lock()
+# 提前刷新的安全余量，单位：秒
+_TOKEN_REFRESH_BUFFER = 60
+
+_TOKEN_URL = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
+_TOKEN_HEADERS = {
+    "Content-Type": "application/json; charset=utf-8"
+}
+
+# 飞书开放平台表示tenant_access_token无效或已过期的错误码
+_INVALID_TOKEN_CODES = frozenset((99991663, 99991668))
+
+# 配置文件中的默认凭证及预先序列化好的请求体，值为((app_id, app_secret), 请求体)
+# 首次使用时才读取配置，导入本模块不会加载.env
+_DEFAULT_CREDENTIALS: Optional[Tuple[Tuple[str, str], Optional[bytes]]] = None
+
+
+def _default_credentials() -> Tuple[Tuple[str, str], Optional[bytes]]:
+    """
+    获取配置文件中的默认凭证，首次调用时读取配置并序列化请求体
+
+    Returns:
+        Tuple[Tuple[str, str], Optional[bytes]]: ((app_id, app_secret), 请求体)，凭证不完整时请求体为None
+    """
+    global _DEFAULT_CREDENTIALS
+    if _DEFAULT_CREDENTIALS is None:
+        # 配置在进程内不变，并发首次调用时重复计算的结果相同，无需加锁
+        app_id, app_secret = config.APP_ID, config.APP_SECRET
+        payload = dumps_bytes({
+            "app_id": app_id,
+            "app_secret": app_secret
+        }) if app_id and app_secret else None
+        _DEFAULT_CREDENTIALS = ((app_id, app_secret), payload)
+    return _DEFAULT_CREDENTIALS
+
+
+def _get_cached_token(key: Tuple[str, str]) -> Optional[str]:
+    """
+    读取未过期的缓存token
+
+    Args:
+        key: (app_id, app_secret)
+
+    Returns:
+        Optional[str]: 缓存的token，如果不存在或即将过期则返回None
+    """
+    cached = _TOKEN_CACHE.get(key)
+    if cached and time.monotonic() < cached[1] - _TOKEN_REFRESH_BUFFER:
+        return cached[0]
+    return None
+
+
+def invalidate_token(app_id: Optional[str] = None, app_secret: Optional[str] = None, stale_token: Optional[str] = None) -> None:
+    """
+    使缓存的 tenant_access_token 失效，下次调用时强制刷新（例如收到401时）
+
+    Args:
+        app_id: 应用ID，如果为None则使用配置文件中的APP_ID
+        app_secret: 应用密钥，如果为None则使用配置文件中的APP_SECRET
+        stale_token: 已失效的token，指定时仅当缓存中仍是该token才清除，避免并发时误删其他线程刚刷新的token
+    """
+    default_key = _default_credentials()[0]
+    key = (app_id or default_key[0], app_secret or default_key[1])
+    with _TOKEN_LOCK:
+        cached = _TOKEN_CACHE.get(key)
+        if cached and (stale_token is None or cached[0] == stale_token):
+            del _TOKEN_CACHE[key]
+
+
+def is_invalid_token_response(response: requests.Response) -> bool:
+    """
+    判断响应是否表示tenant_access_token无效或已过期
+
+    Args:
+        response: 飞书开放平台接口的响应
+
+    Returns:
+        bool: 是否为令牌失效的响应
+    """
+    if response.status_code == 401:
+        return True
+    # 成功响应不解析响应体；令牌失效时飞书返回4xx并在code中给出错误码
+    if response.status_code < 400:
+        return False
+    try:
+        return loads(response.content).get("code") in _INVALID_TOKEN_CODES
+    except Exception:
+        return False
+
+
+def request_with_token(method: str, url: str, tenant_access_token: str, headers: Optional[Dict[str, str]] = None, **kwargs: Any) -> requests.Response:
+    """
+    携带tenant_access_token发起请求，令牌失效时清除缓存、使用配置文件中的凭证换取新令牌后重试一次
+
+    Args:
+        method: HTTP方法
+        url: 请求地址
+        tenant_access_token: 租户访问令牌
+        headers: 额外的请求头，Authorization由本函数设置
+        **kwargs: 透传给requests的其他参数（params、data、files等）
+
+    Returns:
+        requests.Response: 最终的响应，重试失败时返回第一次的响应，由调用方处理
+    """
+    kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+    request_headers = dict(headers or {})
+    request_headers["Authorization"] = f"Bearer {tenant_access_token}"
+    response = get_session().request(method, url, headers=request_headers, **kwargs)
+    if not is_invalid_token_response(response):
+        return response
+
+    logger.warning("tenant_access_token rejected by %s, refreshing and retrying once", url)
+    invalidate_token(stale_token=tenant_access_token)
+    new_token, err = get_tenant_access_token()
+    if err or not new_token or new_token == tenant_access_token:
+        return response
+    request_headers["Authorization"] = f"Bearer {new_token}"
+    return get_session().request(method, url, headers=request_headers, **kwargs)
+
 
 def get_tenant_access_token(app_id: Optional[str] = None, app_secret: Optional[str] = None) -> Tuple[str, Exception]:
     """
@@ -23,44 +152,79 @@ def get_tenant_access_token(app_id: Optional[str] = None, app_secret: Optional[s
     Returns:
         Tuple[str, Exception]: (access_token, error)
     """
-    # 使用传入的参数或配置文件中的值
-    app_id = app_id or APP_ID
-    app_secret = app_secret or APP_SECRET
-    
-    # 验证参数
-    if not app_id or not app_secret:
-        error_msg = "app_id or app_secret is null"
-        print(f"ERROR: {error_msg}", file=sys.stderr)
-        return "", Exception(error_msg)
-    
-    url = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
-    payload = {
-        "app_id": app_id,
-        "app_secret": app_secret
-    }
-    headers = {
-        "Content-Type": "application/json; charset=utf-8"
-    }
-    
+    default_key, default_payload = _default_credentials()
+    if app_id is None and app_secret is None and default_payload:
+        # 使用配置文件中的默认凭证，首次使用时已完成校验和序列化
+        key = default_key
+    else:
+        # 使用传入的参数或配置文件中的值
+        app_id = app_id or default_key[0]
+        app_secret = app_secret or default_key[1]
+        
+        # 验证参数
+        if not app_id or not app_secret:
+            error_msg = "app_id or app_secret is null"
+            logger.error(error_msg)
+            return "", Exception(error_msg)
+        key = (app_id, app_secret)
+
+    # 命中缓存则直接返回，避免重复请求
+    token = _get_cached_token(key)
+    if token:
+        return token, None
+
+    # 加锁后再次检查缓存，保证并发调用时只刷新一次
+    with _TOKEN_LOCK:
+        token = _get_cached_token(key)
+        if token:
+            return token, None
+        return _fetch_tenant_access_token(key)
+
+
+def _fetch_tenant_access_token(key: Tuple[str, str]) -> Tuple[str, Exception]:
+    """
+    请求飞书接口获取 tenant_access_token 并写入缓存
+
+    Args:
+        key: 缓存键(app_id, app_secret)
+
+    Returns:
+        Tuple[str, Exception]: (access_token, error)
+    """
+    default_key, default_payload = _default_credentials()
+    if key == default_key and default_payload:
+        body = default_payload
+    else:
+        body = dumps_bytes({
+            "app_id": key[0],
+            "app_secret": key[1]
+        })
+
     try:
-        print(f"POST: {url}")
-        print(f"Request payload: {json.dumps(payload)}")
-        response = requests.post(url, json=payload, headers=headers)
+        logger.debug("POST: %s", _TOKEN_URL)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Request payload: %s", body.decode("utf-8"))
+        response = get_session().post(_TOKEN_URL, data=body, headers=_TOKEN_HEADERS, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
 
-        result = response.json()
-        print(f"Response: {json.dumps(result)}")
+        result = loads(response.content)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Response: %s", dumps(result))
 
         if result.get("code", 0) != 0:
             error_msg = f"failed to get tenant_access_token: {result.get('msg', 'unknown error')}"
-            print(f"ERROR: {error_msg}", file=sys.stderr)
+            logger.error(error_msg)
             return "", Exception(error_msg)
 
-        return result["tenant_access_token"], None
+        token = result["tenant_access_token"]
+        # expire 为token剩余有效时间，单位：秒
+        _TOKEN_CACHE[key] = (token, time.monotonic() + result.get("expire", 0))
+
+        return token, None
 
     except Exception as e:
         error_msg = f"Error getting tenant_access_token: {e}"
         if hasattr(e, 'response') and e.response is not None:
             error_msg += f" Response: {e.response.text}"
-        print(f"ERROR: {error_msg}", file=sys.stderr)
+        logger.error(error_msg)
         return "", e
\ No newline at end of file
@@ -4,74 +4,140 @@
 Card 模板
 """
 
-import json
-import sys
-from typing import Dict, Any, List, Optional
+import logging
+import time
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping, Optional, Tuple
 from doc_fetcher import get_weekly_report_data
+from json_utils import dumps
 from config import (
     SPREADSHEET_TOKEN, SHEET_ID, DOC_TOKEN,
     BITABLE_TOKEN, TABLE_ID, ENABLE_DYNAMIC_DATA,
     _STATIC_COMMON, _STATIC_ITEMS,
-    CARD_TEMPLATE_ID, CARD_TEMPLATE_VERSION
+    CARD_TEMPLATE_ID, CARD_TEMPLATE_VERSION, CARD_DATA_TTL
 )
 
+logger = logging.getLogger(__name__)
 
-def get_card_data() -> Dict[str, Any]:
+# 默认图片，动态数据中item的pictures为空时使用
+_DEFAULT_PICTURES = (
+    {"img_key": "img_v3_02ad_e19fca1f-912a-450e-95de-3c229091b53g"},  # 示例默认图片
+)
+
+# 静态卡片数据，只构建一次，只读共享给所有调用方
+_STATIC_PAYLOAD = MappingProxyType({
+    "common": _STATIC_COMMON,
+    "items": _STATIC_ITEMS
+})
+
+# 卡片模板中固定不变的部分，template_id从卡片搭建工具中获取
+_CARD_SHELL = MappingProxyType({
+    "template_id": CARD_TEMPLATE_ID,
+    "template_version_name": CARD_TEMPLATE_VERSION
+})
+
+# 动态卡片数据缓存，值为(获取时间点, 数据)，时间点基于time.monotonic()
+_card_data_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+
+
+def clear_card_data_cache() -> None:
     """
-    获取卡片数据
+    清空卡片数据缓存，下次调用get_card_data时重新获取
+    """
+    global _card_data_cache
+    _card_data_cache = None
+
+
+def get_card_data() -> Mapping[str, Any]:
+    """
+    获取卡片数据，动态数据在CARD_DATA_TTL秒内直接复用缓存
     
     Returns:
-        Dict[str, Any]: 包含common和items的卡片数据
+        Mapping[str, Any]: 包含common和items的卡片数据，静态数据为只读映射
     """
-    print(f"DEBUG: ENABLE_DYNAMIC_DATA: {ENABLE_DYNAMIC_DATA}")
-    if ENABLE_DYNAMIC_DATA:
-        try:
-            # 从飞书文档、表格或多维表格动态获取数据
-            print(f"DEBUG: Getting dynamic data...")
-            data = get_weekly_report_data(
-                doc_token=DOC_TOKEN if DOC_TOKEN else None,
-                spreadsheet_token=SPREADSHEET_TOKEN if SPREADSHEET_TOKEN else None,
-                sheet_id=SHEET_ID if SHEET_ID else None,
-                bitable_token=BITABLE_TOKEN if BITABLE_TOKEN else None,
-                table_id=TABLE_ID if TABLE_ID else None
-            )
-            print(f"DEBUG: Dynamic data received: {json.dumps(data, ensure_ascii=False)}")
-            
-            # 优化：检查每个item的pictures字段，如果为空，则添加默认图片
-            for item in data["items"]:
-                if not item.get("pictures") or len(item["pictures"]) == 0:
-                    # 添加默认图片或从静态数据中获取图片
-                    default_pics = [
-                        {"img_key": "img_v3_02ad_e19fca1f-912a-450e-95de-3c229091b53g"}  # 示例默认图片
-                    ]
-                    item["pictures"] = default_pics
-                    print(f"DEBUG: Added default pictures to item: {item['name']}")
-            
-            return data
-        except Exception as e:
-            print(f"WARNING: Failed to get dynamic data, using static data instead: {e}", file=sys.stderr)
-            # 如果动态获取失败，回退到静态数据
-            return {
-                "common": _STATIC_COMMON,
-                "items": _STATIC_ITEMS
-            }
-    else:
+    global _card_data_cache
+    if not ENABLE_DYNAMIC_DATA:
         # 使用静态数据
-        print(f"DEBUG: Using static data")
-        return {
-            "common": _STATIC_COMMON,
-            "items": _STATIC_ITEMS
-        }
+        return _STATIC_PAYLOAD
+
+    if _card_data_cache and time.monotonic() - _card_data_cache[0] < CARD_DATA_TTL:
+        return _card_data_cache[1]
+
+    try:
+        # 从飞书文档、表格或多维表格动态获取数据
+        logger.debug("Getting dynamic data...")
+        data = get_weekly_report_data(
+            doc_token=DOC_TOKEN if DOC_TOKEN else None,
+            spreadsheet_token=SPREADSHEET_TOKEN if SPREADSHEET_TOKEN else None,
+            sheet_id=SHEET_ID if SHEET_ID else None,
+            bitable_token=BITABLE_TOKEN if BITABLE_TOKEN else None,
+            table_id=TABLE_ID if TABLE_ID else None
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Dynamic data received: %s", dumps(data))
+        
+        # 优化：检查每个item的pictures字段，如果为空，则添加默认图片
+        for item in data["items"]:
+            if not item.get("pictures"):
+                # 添加默认图片
+                item["pictures"] = list(_DEFAULT_PICTURES)
+                logger.debug("Added default pictures to item: %s", item["name"])
+        
+        # 只缓存成功获取的动态数据，失败时下次调用会重新尝试
+        _card_data_cache = (time.monotonic(), data)
+        return data
+    except Exception as e:
+        logger.warning("Failed to get dynamic data, using static data instead: %s", e)
+        # 如果动态获取失败，回退到静态数据
+        return _STATIC_PAYLOAD
+
+
+def build_card_config(card_data: Optional[Mapping[str, Any]] = None) -> Dict[str, Any]:
+    """
+    构建卡片配置，模板ID和版本固定，只替换template_variable
 
-# 获取卡片数据
-card_data = get_card_data()
+    Args:
+        card_data: 卡片数据（可选），为None时通过get_card_data获取
 
-# 卡片消息配置
-CARD_CONFIG = {
-    "template_id": CARD_TEMPLATE_ID,  # 卡片ID，从卡片搭建工具中获取
-    "template_version_name": CARD_TEMPLATE_VERSION,
-    "template_variable": {
-        "common": card_data["common"], 
-        "item": card_data["items"]
+    Returns:
+        Dict[str, Any]: 卡片配置，包含template_id、template_version_name和template_variable
+    """
+    if card_data is None:
+        card_data = get_card_data()
+    return {
+        **_CARD_SHELL,
+        "template_variable": {
+            "common": card_data["common"],
+            "item": card_data["items"]
+        }
     }
-}
\ No newline at end of file
+
+
+def build_card_content(card_config: Dict[str, Any]) -> str:
+    """
+    将卡片配置序列化为卡片消息的content字符串
+
+    Args:
+        card_config: 卡片配置，包含template_id、template_version_name和template_variable
+
+    Returns:
+        str: 飞书卡片消息要求的content JSON字符串
+    """
+    return dumps({
+        "type": "template",
+        "data": card_config
+    })
+
+
+def __getattr__(name: str) -> Any:
+    """
+    兼容旧的模块属性card_data、CARD_CONFIG、CARD_CONTENT（PEP 562）
+    访问时才获取数据，导入card模块不再触发网络请求，数据随get_card_data的缓存刷新
+    """
+    if name == "card_data":
+        return get_card_data()
+    if name == "CARD_CONFIG":
+        return build_card_config()
+    if name == "CARD_CONTENT":
+        return build_card_content(build_card_config())
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
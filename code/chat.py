@@ -5,11 +5,14 @@
 用于处理飞书群组相关的功能
 """
 
-import json
-import requests
-import sys
+import logging
 from typing import List, Dict, Any
 
+from auth import request_with_token
+from json_utils import dumps, loads
+
+logger = logging.getLogger(__name__)
+
 def get_bot_chats(tenant_access_token: str, page_size: int = 100) -> List[Dict[str, Any]]:
     """
     获取机器人所在的群列表
@@ -23,46 +26,42 @@ def get_bot_chats(tenant_access_token: str, page_size: int = 100) -> List[Dict[s
     """
     url = "https://open.feishu.cn/open-apis/im/v1/chats"
     headers = {
-        "Authorization": f"Bearer {tenant_access_token}",
         "Content-Type": "application/json; charset=utf-8"
     }
     
     all_chats = []
-    page_token = ""
+    params = {
+        "page_size": page_size
+    }
     
     while True:
-        params = {
-            "page_size": page_size
-        }
-        if page_token:
-            params["page_token"] = page_token
-            
         try:
-            print(f"GET: {url} with params: {params}")
-            response = requests.get(url, headers=headers, params=params)
+            logger.debug("GET: %s with params: %s", url, params)
+            response = request_with_token("GET", url, tenant_access_token, headers=headers, params=params)
             response.raise_for_status()
             
-            result = response.json()
-            print(f"Response: {json.dumps(result)}")
+            result = loads(response.content)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Response: %s", dumps(result))
             
             if result.get("code", 0) != 0:
                 error_msg = f"failed to get bot chats: {result.get('msg', 'unknown error')}"
-                print(f"ERROR: {error_msg}", file=sys.stderr)
+                logger.error(error_msg)
                 raise Exception(error_msg)
                 
             data = result.get("data", {})
             items = data.get("items", [])
-            all_chats.extend(items)
+            all_chats += items
             
             if not data.get("has_more", False):
                 break
-            page_token = data.get("page_token", "")
+            params["page_token"] = data.get("page_token", "")
             
         except Exception as e:
             error_msg = f"Error getting bot chats: {e}"
             if hasattr(e, 'response') and e.response is not None:
                 error_msg += f" Response: {e.response.text}"
-            print(f"ERROR: {error_msg}", file=sys.stderr)
+            logger.error(error_msg)
             raise
     
     return all_chats
\ No newline at end of file
@@ -1,30 +1,58 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import functools
 import os
+import re
+from pathlib import Path
 from typing import List, Dict, Any
 
-# 手动加载环境变量
-env_path = "/Users/bytedance/AI/csm_ai/.env"
-if os.path.exists(env_path):
-    with open(env_path, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith('#'):
-                key, value = line.split('=', 1)
-                key = key.strip()
-                value = value.strip().strip('"')
-                os.environ[key] = value
-
-# 应用配置
-APP_ID = os.environ.get("APP_ID")
-APP_SECRET = os.environ.get("APP_SECRET")
+# .env中每行的格式为 KEY=VALUE 或 KEY="VALUE"
+_ENV_LINE_RE = re.compile(r'^\s*([^#=\s]+)\s*=\s*(.*?)\s*$')
+
+# 从环境变量读取的配置项，首次访问时才加载.env
+_ENV_SETTINGS = ("APP_ID", "APP_SECRET", "ARK_API_KEY")
+
+
+@functools.lru_cache(maxsize=None)
+def _load_env_once() -> None:
+    """
+    手动加载环境变量，整个进程只执行一次
+    默认读取项目根目录下的.env，可通过环境变量FEISHU_ENV_FILE指定其他路径
+    """
+    env_path = Path(os.environ.get("FEISHU_ENV_FILE", Path(__file__).resolve().parent.parent / ".env")).expanduser()
+    try:
+        for line in env_path.read_text(encoding="utf-8").splitlines():
+            match = _ENV_LINE_RE.match(line)
+            if match:
+                # 已存在的环境变量优先，不被.env覆盖
+                # 值整体保留，只去掉两端的引号，值中间的引号（如JSON）不受影响
+                os.environ.setdefault(match.group(1), match.group(2).strip('"'))
+    except FileNotFoundError:
+        pass
+
+
+def __getattr__(name: str) -> Any:
+    """
+    延迟解析应用配置（PEP 562），导入config时不读取文件
+    `from config import APP_ID` 同样会走到这里，首次访问后结果缓存为模块属性
+    """
+    if name in _ENV_SETTINGS:
+        _load_env_once()
+        value = os.environ.get(name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # 消息去重配置
 PROCESSED_MESSAGES_FILE = "/tmp/processed_messages.json"
 MAX_MESSAGE_AGE = 300  # 消息最大处理时间，单位：秒
+PROCESSED_MESSAGES_FLUSH_INTERVAL = 1  # 已处理消息ID批量刷盘的间隔，单位：秒
+PROCESSED_MESSAGES_MAX = 100000  # 内存中保留的已处理消息ID上限，持久化文件超过该行数时重写
 
 # 周报时间过滤配置
 WEEKLY_REPORT_FILTER_DAYS = 7  # 只显示最近7天的记录
+WEEKLY_REPORT_SEND_CONCURRENCY = 16  # 群发周报时的最大并发数，受飞书发送消息接口频率限制，不宜过大
 
 # 飞书文档/表格/多维表格配置
 # 1. 飞书表格配置
@@ -40,6 +68,7 @@ TABLE_ID = "tbllDjGyEJXPdtJI"  # 多维表格中的表ID，从多维表格URL或
 
 # 数据获取配置
 ENABLE_DYNAMIC_DATA = True  # 是否启用动态数据获取
+CARD_DATA_TTL = 300  # 动态卡片数据缓存时间，单位：秒
 
 # BOT_NAME 配置
 BOT_NAME = "CSM-AI"
@@ -81,6 +110,8 @@ ARK_MAX_TOKENS = 4096  # 最大生成长度
 ARK_TEMPERATURE = 1  # 温度参数，控制输出的随机性
 ARK_TOP_P = 0.7  # 核采样参数
 ARK_REASONING_EFFORT = "minimal"  # 推理努力程度
+ARK_MAX_CONCURRENCY = 8  # 同时处理的问答请求数，不同群组的@消息并发调用大模型
+ARK_MAX_RETRIES = 3  # 429限流、5xx和连接错误时SDK内部按指数退避重试的次数
 ARK_SYSTEM_PROMPT = """你是一位精通AI知识的大牛，回答各位关于AI的知识，其他闲聊可以有些幽默、爱开车的段子手，回答富有哲理的同时，有些幽默风趣，不啰嗦。
 示例
 1.输入
@@ -5,14 +5,35 @@
 用于从飞书文档获取周报数据并转换为卡片所需格式
 """
 
-import json
-import requests
-import sys
+import logging
+import re
 import datetime
-from typing import Dict, Any, List, Optional
-from auth import get_tenant_access_token
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from auth import get_tenant_access_token, request_with_token
+from json_utils import dumps_bytes, loads
 from config import WEEKLY_REPORT_FILTER_DAYS, DEFAULT_WEEKLY_REPORT_TITLE
 
+logger = logging.getLogger(__name__)
+
+# 获取图片image_key需要先下载再上传，均为网络I/O，用线程池按记录并发处理
+_IMAGE_EXECUTOR = ThreadPoolExecutor(max_workers=16)
+
+# file_token到image_key的缓存，image_key归属于应用，与tenant_access_token无关，可跨令牌复用
+_IMAGE_KEY_CACHE: Dict[str, Future] = {}
+_IMAGE_KEY_LOCK = threading.Lock()
+_IMAGE_KEY_CACHE_SIZE = 2048
+
+# 多维表格批量更新接口单次最多支持的记录数
+_BATCH_UPDATE_LIMIT = 500
+
+# 多维表格Time字段支持的时间格式，ISO 8601格式优先用fromisoformat解析
+_TIME_FORMATS = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y/%m/%d", "%Y/%m/%d %H:%M:%S")
+
+# 匹配JSON转义的换行符\n以及实际换行符
+_NL_RE = re.compile(r'\\n|\r\n|\n')
+
 
 def fetch_doc_content(tenant_access_token: str, doc_token: str) -> Dict[str, Any]:
     """
@@ -27,21 +48,20 @@ def fetch_doc_content(tenant_access_token: str, doc_token: str) -> Dict[str, Any
     """
     url = f"https://open.feishu.cn/open-apis/docx/v1/documents/{doc_token}/raw_content"
     headers = {
-        "Authorization": f"Bearer {tenant_access_token}",
         "Content-Type": "application/json; charset=utf-8"
     }
     
     try:
-        print(f"GET: {url}")
-        response = requests.get(url, headers=headers)
+        logger.debug("GET: %s", url)
+        response = request_with_token("GET", url, tenant_access_token, headers=headers)
         response.raise_for_status()
         
-        result = response.json()
-        print(f"Response: {json.dumps(result)}")
+        result = loads(response.content)
+        logger.debug("Response: %s", result)
         
         if result.get("code", 0) != 0:
             error_msg = f"failed to fetch doc content: {result.get('msg', 'unknown error')}"
-            print(f"ERROR: {error_msg}", file=sys.stderr)
+            logger.error(error_msg)
             raise Exception(error_msg)
             
         return result
@@ -50,7 +70,7 @@ def fetch_doc_content(tenant_access_token: str, doc_token: str) -> Dict[str, Any
         error_msg = f"Error fetching doc content: {e}"
         if hasattr(e, 'response') and e.response is not None:
             error_msg += f" Response: {e.response.text}"
-        print(f"ERROR: {error_msg}", file=sys.stderr)
+        logger.error(error_msg)
         raise
 
 
@@ -68,21 +88,20 @@ def fetch_sheet_content(tenant_access_token: str, spreadsheet_token: str, sheet_
     """
     url = f"https://open.feishu.cn/open-apis/sheets/v2/spreadsheets/{spreadsheet_token}/values/{sheet_id}"
     headers = {
-        "Authorization": f"Bearer {tenant_access_token}",
         "Content-Type": "application/json; charset=utf-8"
     }
     
     try:
-        print(f"GET: {url}")
-        response = requests.get(url, headers=headers)
+        logger.debug("GET: %s", url)
+        response = request_with_token("GET", url, tenant_access_token, headers=headers)
         response.raise_for_status()
         
-        result = response.json()
-        print(f"Response: {json.dumps(result)}")
+        result = loads(response.content)
+        logger.debug("Response: %s", result)
         
         if result.get("code", 0) != 0:
             error_msg = f"failed to fetch sheet content: {result.get('msg', 'unknown error')}"
-            print(f"ERROR: {error_msg}", file=sys.stderr)
+            logger.error(error_msg)
             raise Exception(error_msg)
             
         return result
@@ -91,134 +110,184 @@ def fetch_sheet_content(tenant_access_token: str, spreadsheet_token: str, sheet_
         error_msg = f"Error fetching sheet content: {e}"
         if hasattr(e, 'response') and e.response is not None:
             error_msg += f" Response: {e.response.text}"
-        print(f"ERROR: {error_msg}", file=sys.stderr)
+        logger.error(error_msg)
         raise
 
 
-def fetch_bitable_content(tenant_access_token: str, bitable_token: str, table_id: str) -> Dict[str, Any]:
+def iter_bitable_records(tenant_access_token: str, bitable_token: str, table_id: str, page_size: int = 500) -> Iterator[Dict[str, Any]]:
     """
-    从飞书多维表格获取内容
+    分页遍历飞书多维表格中的记录
     
     Args:
         tenant_access_token: 租户访问令牌
         bitable_token: 飞书多维表格token
         table_id: 多维表格中的表ID
+        page_size: 每页记录数，飞书接口上限为500
         
     Returns:
-        Dict[str, Any]: 多维表格内容
+        Iterator[Dict[str, Any]]: 逐条返回的记录，调用方可在后续分页到达前开始处理
     """
     # 飞书多维表格API端点
     url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{bitable_token}/tables/{table_id}/records"
     headers = {
-        "Authorization": f"Bearer {tenant_access_token}",
         "Content-Type": "application/json; charset=utf-8"
     }
+    params = {"page_size": page_size}
     
     try:
-        print(f"GET: {url}")
-        response = requests.get(url, headers=headers)
-        
-        # 增强错误处理，提供更清晰的错误信息
-        if response.status_code == 400:
-            error_response = response.json()
-            if error_response.get("code") == 99991672:
-                # 权限错误处理
-                error_msg = f"Failed to fetch bitable content: Permission denied. Error code: {error_response.get('code')}"
-                error_msg += f"\nPlease enable the required permissions for your Feishu app at:"
-                error_msg += f"\nhttps://open.feishu.cn/app/cli_a9afe48337fb5bde/auth?q=bitable:app:readonly,bitable:app,base:record:retrieve"
-                error_msg += f"\nError details: {error_response.get('msg')}"
-                print(f"ERROR: {error_msg}", file=sys.stderr)
+        while True:
+            logger.debug("GET: %s params: %s", url, params)
+            response = request_with_token("GET", url, tenant_access_token, headers=headers, params=params)
+            
+            # 增强错误处理，提供更清晰的错误信息
+            if response.status_code == 400:
+                error_response = loads(response.content)
+                if error_response.get("code") == 99991672:
+                    # 权限错误处理
+                    error_msg = f"Failed to fetch bitable content: Permission denied. Error code: {error_response.get('code')}"
+                    error_msg += f"\nPlease enable the required permissions for your Feishu app at:"
+                    error_msg += f"\nhttps://open.feishu.cn/app/cli_a9afe48337fb5bde/auth?q=bitable:app:readonly,bitable:app,base:record:retrieve"
+                    error_msg += f"\nError details: {error_response.get('msg')}"
+                    logger.error(error_msg)
+                    raise Exception(error_msg)
+            
+            response.raise_for_status()
+            
+            result = loads(response.content)
+            logger.debug("Response: %s", result)
+            
+            if result.get("code", 0) != 0:
+                error_msg = f"failed to fetch bitable content: {result.get('msg', 'unknown error')}"
+                logger.error(error_msg)
                 raise Exception(error_msg)
-        
-        response.raise_for_status()
-        
-        result = response.json()
-        print(f"Response: {json.dumps(result)}")
-        
-        if result.get("code", 0) != 0:
-            error_msg = f"failed to fetch bitable content: {result.get('msg', 'unknown error')}"
-            print(f"ERROR: {error_msg}", file=sys.stderr)
-            raise Exception(error_msg)
             
-        return result
+            data = result.get("data") or {}
+            yield from data.get("items") or []
+            
+            # 没有更多数据时结束，否则带上page_token请求下一页
+            page_token = data.get("page_token")
+            if not data.get("has_more") or not page_token:
+                break
+            params["page_token"] = page_token
         
     except Exception as e:
         error_msg = f"Error fetching bitable content: {e}"
         if hasattr(e, 'response') and e.response is not None:
             error_msg += f" Response: {e.response.text}"
-        print(f"ERROR: {error_msg}", file=sys.stderr)
+        logger.error(error_msg)
         raise
 
 
-def update_bitable_record(tenant_access_token: str, bitable_token: str, table_id: str, record_id: str, field_name: str, image_key: str) -> bool:
+def batch_update_bitable_records(tenant_access_token: str, bitable_token: str, table_id: str, updates: List[Tuple[str, str, str]]) -> bool:
     """
-    更新飞书多维表格记录，将image_key写入到指定字段
+    批量更新飞书多维表格记录，将image_key写入到指定字段
+    同一记录的多个字段合并为一条记录，每次请求最多更新500条记录
     
     Args:
         tenant_access_token: 租户访问令牌
         bitable_token: 飞书多维表格token
         table_id: 多维表格中的表ID
-        record_id: 记录ID
-        field_name: 要更新的字段名称
-        image_key: 要写入的image_key
+        updates: 待更新列表，每个元素为(record_id, field_name, image_key)
         
     Returns:
-        bool: 更新是否成功
+        bool: 是否全部更新成功
     """
-    # 飞书多维表格API端点，用于更新记录
-    url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{bitable_token}/tables/{table_id}/records/{record_id}"
+    # 飞书多维表格API端点，用于批量更新记录
+    url = f"https://open.feishu.cn/open-apis/bitable/v1/apps/{bitable_token}/tables/{table_id}/records/batch_update"
     headers = {
-        "Authorization": f"Bearer {tenant_access_token}",
         "Content-Type": "application/json; charset=utf-8"
     }
     
-    # 构建请求体，只更新指定字段
-    payload = {
-        "fields": {
-            field_name: image_key
-        }
-    }
+    # 按record_id合并字段，同一字段多次写入时以最后一次为准
+    fields_by_record: Dict[str, Dict[str, str]] = {}
+    for record_id, field_name, image_key in updates:
+        fields_by_record.setdefault(record_id, {})[field_name] = image_key
+    records = [{"record_id": record_id, "fields": fields} for record_id, fields in fields_by_record.items()]
     
-    try:
-        print(f"PUT: {url}")
-        print(f"Payload: {json.dumps(payload)}")
-        response = requests.put(url, headers=headers, json=payload)
-        
-        # 增强错误处理，提供更清晰的错误信息
-        if response.status_code == 400:
-            error_response = response.json()
-            if error_response.get("code") == 99991672:
-                # 权限错误处理
-                error_msg = f"Failed to update bitable record: Permission denied. Error code: {error_response.get('code')}"
-                error_msg += f"\nPlease enable the required permissions for your Feishu app at:"
-                error_msg += f"\nhttps://open.feishu.cn/app/cli_a9afe48337fb5bde/auth?q=bitable:app:readonly,bitable:app,base:record:write,base:record:retrieve"
-                error_msg += f"\nError details: {error_response.get('msg')}"
-                print(f"ERROR: {error_msg}", file=sys.stderr)
-                return False
-        
-        response.raise_for_status()
-        
-        result = response.json()
-        print(f"Response: {json.dumps(result)}")
+    success = True
+    for start in range(0, len(records), _BATCH_UPDATE_LIMIT):
+        payload = {
+            "records": records[start:start + _BATCH_UPDATE_LIMIT]
+        }
         
-        if result.get("code", 0) != 0:
-            error_msg = f"failed to update bitable record: {result.get('msg', 'unknown error')}"
-            print(f"ERROR: {error_msg}", file=sys.stderr)
-            return False
+        try:
+            logger.debug("POST: %s", url)
+            logger.debug("Payload: %s", payload)
+            response = request_with_token("POST", url, tenant_access_token, headers=headers, data=dumps_bytes(payload))
             
-        return True
+            # 增强错误处理，提供更清晰的错误信息
+            if response.status_code == 400:
+                error_response = loads(response.content)
+                if error_response.get("code") == 99991672:
+                    # 权限错误处理
+                    error_msg = f"Failed to batch update bitable records: Permission denied. Error code: {error_response.get('code')}"
+                    error_msg += f"\nPlease enable the required permissions for your Feishu app at:"
+                    error_msg += f"\nhttps://open.feishu.cn/app/cli_a9afe48337fb5bde/auth?q=bitable:app:readonly,bitable:app,base:record:write,base:record:retrieve"
+                    error_msg += f"\nError details: {error_response.get('msg')}"
+                    logger.error(error_msg)
+                    return False
+            
+            response.raise_for_status()
+            
+            result = loads(response.content)
+            logger.debug("Response: %s", result)
+            
+            if result.get("code", 0) != 0:
+                error_msg = f"failed to batch update bitable records: {result.get('msg', 'unknown error')}"
+                logger.error(error_msg)
+                success = False
+                
+        except Exception as e:
+            error_msg = f"Error batch updating bitable records: {e}"
+            if hasattr(e, 'response') and e.response is not None:
+                error_msg += f" Response: {e.response.text}"
+            logger.error(error_msg)
+            success = False
+    
+    return success
+
+def get_image_key(tenant_access_token: str, file_token: str) -> str:
+    """
+    根据file_token获取飞书图片image_key，相同file_token只下载上传一次
+    
+    Args:
+        tenant_access_token: 租户访问令牌
+        file_token: 文件token
         
+    Returns:
+        str: 图片image_key
+    """
+    # 缓存中存放Future：并发处理的记录引用同一附件时，只有第一个线程发起请求，其余线程等待其结果
+    with _IMAGE_KEY_LOCK:
+        future = _IMAGE_KEY_CACHE.get(file_token)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            _IMAGE_KEY_CACHE[file_token] = future
+            # 超出上限时淘汰最早加入的条目
+            if len(_IMAGE_KEY_CACHE) > _IMAGE_KEY_CACHE_SIZE:
+                del _IMAGE_KEY_CACHE[next(iter(_IMAGE_KEY_CACHE))]
+    
+    if not is_owner:
+        return future.result()
+    
+    try:
+        image_key = _fetch_image_key(tenant_access_token, file_token)
     except Exception as e:
-        error_msg = f"Error updating bitable record: {e}"
-        if hasattr(e, 'response') and e.response is not None:
-            error_msg += f" Response: {e.response.text}"
-        print(f"ERROR: {error_msg}", file=sys.stderr)
-        return False
+        # 失败的结果不缓存，下次调用重新请求
+        with _IMAGE_KEY_LOCK:
+            if _IMAGE_KEY_CACHE.get(file_token) is future:
+                del _IMAGE_KEY_CACHE[file_token]
+        future.set_exception(e)
+        raise
+    
+    future.set_result(image_key)
+    return image_key
 
 
-def get_image_key(tenant_access_token: str, file_token: str) -> str:
+def _fetch_image_key(tenant_access_token: str, file_token: str) -> str:
     """
-    根据file_token获取飞书图片image_key
+    下载file_token对应的图片并上传，获取飞书图片image_key
     
     Args:
         tenant_access_token: 租户访问令牌
@@ -229,28 +298,20 @@ def get_image_key(tenant_access_token: str, file_token: str) -> str:
     """
     # Step 1: 下载图片内容
     download_url = f"https://open.feishu.cn/open-apis/drive/v1/medias/{file_token}/download"
-    headers = {
-        "Authorization": f"Bearer {tenant_access_token}",
-    }
-    
     try:
-        print(f"GET: {download_url}")
-        response = requests.get(download_url, headers=headers)
+        logger.debug("GET: %s", download_url)
+        response = request_with_token("GET", download_url, tenant_access_token)
         response.raise_for_status()
         image_content = response.content
     except Exception as e:
         error_msg = f"Error downloading image: {e}"
         if hasattr(e, 'response') and e.response is not None:
             error_msg += f" Response: {e.response.text}"
-        print(f"ERROR: {error_msg}", file=sys.stderr)
+        logger.error(error_msg)
         raise
     
     # Step 2: 上传图片获取image_key
     upload_url = "https://open.feishu.cn/open-apis/im/v1/images"
-    upload_headers = {
-        "Authorization": f"Bearer {tenant_access_token}",
-    }
-    
     # 构建请求体
     files = {
         "image": (f"image_{file_token}.png", image_content, "image/png"),
@@ -261,16 +322,16 @@ def get_image_key(tenant_access_token: str, file_token: str) -> str:
     }
     
     try:
-        print(f"POST: {upload_url}")
-        response = requests.post(upload_url, headers=upload_headers, files=files, data=data)
+        logger.debug("POST: %s", upload_url)
+        response = request_with_token("POST", upload_url, tenant_access_token, files=files, data=data)
         response.raise_for_status()
         
-        result = response.json()
-        print(f"Response: {json.dumps(result)}")
+        result = loads(response.content)
+        logger.debug("Response: %s", result)
         
         if result.get("code", 0) != 0:
             error_msg = f"failed to upload image: {result.get('msg', 'unknown error')}"
-            print(f"ERROR: {error_msg}", file=sys.stderr)
+            logger.error(error_msg)
             raise Exception(error_msg)
 
             
@@ -280,37 +341,36 @@ def get_image_key(tenant_access_token: str, file_token: str) -> str:
         error_msg = f"Error uploading image: {e}"
         if hasattr(e, 'response') and e.response is not None:
             error_msg += f" Response: {e.response.text}"
-        print(f"ERROR: {error_msg}", file=sys.stderr)
+        logger.error(error_msg)
         raise
 
 
-def extract_img_keys(img_field: Any, tenant_access_token: str, bitable_token: Optional[str] = None, table_id: Optional[str] = None, record_id: Optional[str] = None, field_name: Optional[str] = None) -> List[str]:
+def extract_img_keys(img_field: Any, tenant_access_token: str, record_id: Optional[str] = None, field_name: Optional[str] = None, pending_updates: Optional[List[Tuple[str, str, str]]] = None) -> List[str]:
     """
     从图片字段中提取图片key列表
     
     Args:
         img_field: 图片字段数据，可能是列表（附件类型）或字符串（文本类型）
         tenant_access_token: 租户访问令牌，用于获取图片image_key
-        bitable_token: 飞书多维表格token，用于更新记录（可选）
-        table_id: 多维表格中的表ID，用于更新记录（可选）
         record_id: 记录ID，用于更新记录（可选）
         field_name: 图片字段名称，用于更新记录（可选）
+        pending_updates: 待写回多维表格的(record_id, field_name, image_key)列表，新获取的image_key会追加到其中（可选）
         
     Returns:
         List[str]: 提取的图片key列表
     """
     img_keys = []
-    print(f"DEBUG: Processing img_field: {img_field}, type: {type(img_field)}")
+    logger.debug("Processing img_field: %s, type: %s", img_field, type(img_field))
     if isinstance(img_field, list):
         # 附件类型字段，返回格式为[{"file_token": "KUJvbTl9...", "name": "xxx.jpg", "type": "image"}, ...]
-        print(f"DEBUG: img_field is list, length: {len(img_field)}")
+        logger.debug("img_field is list, length: %s", len(img_field))
         for i, img_item in enumerate(img_field):
-            print(f"DEBUG: img_item {i}: {img_item}, type: {type(img_item)}")
+            logger.debug("img_item %s: %s, type: %s", i, img_item, type(img_item))
             if isinstance(img_item, dict):
                 # 检查是否有file_token字段
                 if "file_token" in img_item:
                     file_token = img_item["file_token"]
-                    print(f"DEBUG: Found file_token: {file_token}")
+                    logger.debug("Found file_token: %s", file_token)
                     if file_token.startswith("img_"):
                         # 如果已经是img_key格式，直接使用
                         img_keys.append(file_token)
@@ -319,18 +379,18 @@ def extract_img_keys(img_field: Any, tenant_access_token: str, bitable_token: Op
                         try:
                             image_key = get_image_key(tenant_access_token, file_token)
 
-                            # 写入image_key 到多维表格的image_key 字段中
-                            if bitable_token and table_id and record_id and field_name:
-                                update_bitable_record(tenant_access_token, bitable_token, table_id, record_id, field_name, image_key)
+                            # 记录待写入多维表格image_key字段的值，由调用方批量写入
+                            if pending_updates is not None and record_id and field_name:
+                                pending_updates.append((record_id, field_name, image_key))
                             img_keys.append(image_key)
                         except Exception as e:
-                            print(f"WARN: Failed to get image_key for file_token {file_token}: {e}")
+                            logger.warning("Failed to get image_key for file_token %s: %s", file_token, e)
                             continue
             else:
-                print(f"DEBUG: img_item {i} is not a dict, skipping")
+                logger.debug("img_item %s is not a dict, skipping", i)
     elif isinstance(img_field, str) and img_field:
         # 文本类型字段
-        print(f"DEBUG: img_field is string: {img_field}")
+        logger.debug("img_field is string: %s", img_field)
         if img_field.startswith("img_"):
             # 如果已经是img_key格式，直接使用
             img_keys.append(img_field)
@@ -338,29 +398,28 @@ def extract_img_keys(img_field: Any, tenant_access_token: str, bitable_token: Op
             # 否则尝试作为file_token处理
             try:
                 image_key = get_image_key(tenant_access_token, img_field)
-                # 将image_key 重新写入到多维表格中，写入到image_key字段
-                if bitable_token and table_id and record_id and field_name:
-                    update_bitable_record(tenant_access_token, bitable_token, table_id, record_id, field_name, image_key)
+                # 记录待写入多维表格image_key字段的值，由调用方批量写入
+                if pending_updates is not None and record_id and field_name:
+                    pending_updates.append((record_id, field_name, image_key))
                 img_keys.append(image_key)
             except Exception as e:
-                print(f"WARN: Failed to get image_key for string {img_field}: {e}")
+                logger.warning("Failed to get image_key for string %s: %s", img_field, e)
     else:
-        print(f"DEBUG: img_field is not a valid type, skipping")
-    print(f"DEBUG: Extracted img_keys: {img_keys}")
+        logger.debug("img_field is not a valid type, skipping")
+    logger.debug("Extracted img_keys: %s", img_keys)
     return img_keys
 
 
-def build_pictures_list(img_fields: List[Any], tenant_access_token: str, bitable_token: Optional[str] = None, table_id: Optional[str] = None, record_id: Optional[str] = None, field_names: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+def build_pictures_list(img_fields: List[Any], tenant_access_token: str, record_id: Optional[str] = None, field_names: Optional[List[str]] = None, pending_updates: Optional[List[Tuple[str, str, str]]] = None) -> List[Dict[str, Any]]:
     """
     构建周报所需的pictures列表
     
     Args:
         img_fields: 图片字段列表
         tenant_access_token: 租户访问令牌，用于获取图片image_key
-        bitable_token: 飞书多维表格token，用于更新记录（可选）
-        table_id: 多维表格中的表ID，用于更新记录（可选）
         record_id: 记录ID，用于更新记录（可选）
         field_names: 图片字段名称列表，用于更新记录（可选）
+        pending_updates: 待写回多维表格的(record_id, field_name, image_key)列表（可选）
         
     Returns:
         List[Dict[str, Any]]: 构建的pictures列表，每个元素包含img_key和i18n_img_key
@@ -369,7 +428,7 @@ def build_pictures_list(img_fields: List[Any], tenant_access_token: str, bitable
     for i, img_field in enumerate(img_fields):
         # 提取图片key
         field_name = field_names[i] if field_names and i < len(field_names) else None
-        img_keys = extract_img_keys(img_field, tenant_access_token, bitable_token, table_id, record_id, field_name)
+        img_keys = extract_img_keys(img_field, tenant_access_token, record_id, field_name, pending_updates)
         # 添加到pictures列表
         for img_key in img_keys:
             pictures.append({
@@ -379,12 +438,118 @@ def build_pictures_list(img_fields: List[Any], tenant_access_token: str, bitable
     return pictures
 
 
+def _resolved_pictures(img_fields: List[Any]) -> Optional[List[Dict[str, Any]]]:
+    """
+    图片字段均已是image_key（或为空）时直接构建pictures列表，无需任何网络请求
+    
+    Args:
+        img_fields: 图片字段列表
+        
+    Returns:
+        Optional[List[Dict[str, Any]]]: 构建的pictures列表，存在需要获取image_key的字段时返回None
+    """
+    pictures = []
+    for img_field in img_fields:
+        if not img_field:
+            continue
+        if not (isinstance(img_field, str) and img_field.startswith("img_")):
+            return None
+        pictures.append({
+            "img_key": img_field,
+            "i18n_img_key": {"zh_cn": img_field}
+        })
+    return pictures
+
+
+def _normalize_desc(desc: str) -> str:
+    """
+    将描述中的换行符转换为<br>标签，JSON转义的\\n和实际换行符一次替换完成
+    
+    Args:
+        desc: 原始描述文本
+        
+    Returns:
+        str: 转换后的描述文本
+    """
+    return _NL_RE.sub('<br>', desc) if desc else desc
+
+def _parse_time_str(time_str: str) -> Optional[datetime.datetime]:
+    """
+    解析多维表格中的时间字符串
+    
+    Args:
+        time_str: 时间字符串，如2025-01-01、2025-01-01T08:00:00Z、2025/01/01 08:00:00
+        
+    Returns:
+        Optional[datetime.datetime]: 本地时间（不带时区），无法解析时返回None
+    """
+    try:
+        # 快速路径：ISO 8601格式
+        record_time = datetime.datetime.fromisoformat(time_str.replace('Z', '+00:00'))
+    except ValueError:
+        # 尝试不同的时间格式解析
+        value = time_str.split('T')[0] if 'T' in time_str else time_str
+        for fmt in _TIME_FORMATS:
+            try:
+                return datetime.datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+        return None
+    
+    # 带时区的时间转换为本地时间，便于与过滤日期比较
+    if record_time.tzinfo is not None:
+        record_time = record_time.astimezone().replace(tzinfo=None)
+    return record_time
+
+def _first(fields: Dict[str, Any], keys: Tuple[str, ...], default: Any = "") -> Any:
+    """
+    按顺序查找字段，返回第一个存在的字段值，找到后不再查找后续字段
+    
+    Args:
+        fields: 记录的字段字典
+        keys: 候选字段名，按优先级排列
+        default: 所有字段都不存在时的默认值
+        
+    Returns:
+        Any: 第一个存在的字段值
+    """
+    for key in keys:
+        if key in fields:
+            return fields[key]
+    return default
+
+def _make_item(name: str, desc: str, pictures: List[Dict[str, Any]], url: str, platform_url: str = "") -> Dict[str, Any]:
+    """
+    构建周报item，两种数据源共用
+    
+    Args:
+        name: 名称
+        desc: 原始描述，换行符会转换为<br>
+        pictures: 图片列表
+        url: 通用链接
+        platform_url: pc/android/ios平台链接（可选，默认为空）
+        
+    Returns:
+        Dict[str, Any]: 周报item
+    """
+    return {
+        "name": name,
+        "desc": _normalize_desc(desc),
+        "pictures": pictures,
+        "url": {
+            "pc_url": platform_url,
+            "android_url": platform_url,
+            "ios_url": platform_url,
+            "url": url
+        }
+    }
+
 def parse_sheet_data(sheet_data: Dict[str, Any], tenant_access_token: str, bitable_token: Optional[str] = None, table_id: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     解析飞书表格数据并转换为周报item格式
     
     Args:
-        sheet_data: 从飞书表格或多维表格获取的原始数据
+        sheet_data: 从飞书表格或多维表格获取的原始数据，多维表格的data.items可以是任意可迭代对象（如iter_bitable_records生成器）
         tenant_access_token: 租户访问令牌，用于获取图片image_key
         bitable_token: 飞书多维表格token，用于更新记录（可选）
         table_id: 多维表格中的表ID，用于更新记录（可选）
@@ -393,6 +558,10 @@ def parse_sheet_data(sheet_data: Dict[str, Any], tenant_access_token: str, bitab
         List[Dict[str, Any]]: 转换后的周报items列表
     """
     items = []
+    # 需要下载上传的pictures在线程池中并发构建，保存(item, future)，最后回填
+    picture_futures = []
+    # 新获取的image_key，解析完成后批量写回多维表格
+    pending_updates: List[Tuple[str, str, str]] = []
     
     # 处理普通飞书表格数据
     if "data" in sheet_data and "valueRange" in sheet_data["data"]:
@@ -403,41 +572,24 @@ def parse_sheet_data(sheet_data: Dict[str, Any], tenant_access_token: str, bitab
                 if len(row) < 5:  # 确保有足够的列数据
                     continue
                     
-                # 解析每行数据
-                name = row[0] if row[0] else ""
-                desc = row[1] if row[1] else ""
-                img_key1 = row[2] if len(row) > 2 and row[2] else ""
-                img_key2 = row[3] if len(row) > 3 and row[3] else ""
-                url = row[4] if len(row) > 4 and row[4] else ""
+                # 解析每行数据，上面已保证至少有5列，空单元格统一转为空字符串
+                name, desc, img_key1, img_key2, url = [cell or "" for cell in row[:5]]
                 
-                # 构建pictures列表
-                pictures = build_pictures_list([img_key1, img_key2], tenant_access_token)
-                
-                # 处理换行符，先解码JSON转义序列\n为实际的\n，再转换为<br>标签
-                if desc:
-                    # 替换JSON转义的换行符\n为实际换行符
-                    desc = desc.replace('\\n', '\n')
-                    # 再将实际换行符转换为HTML <br>标签
-                    desc = desc.replace('\n', '<br>')
-                
-                # 构建item
-                item = {
-                    "name": name,
-                    "desc": desc,
-                    "pictures": pictures,
-                    "url": {
-                        "pc_url": "",
-                        "android_url": "",
-                        "ios_url": "",
-                        "url": url
-                    }
-                }
+                # 构建pictures列表，已是image_key时直接构建，否则提交到线程池处理
+                img_fields = [img_key1, img_key2]
+                pictures = _resolved_pictures(img_fields)
                 
+                # 普通表格只提供通用链接，各平台链接留空
+                item = _make_item(name, desc, pictures if pictures is not None else [], url)
                 items.append(item)
+                if pictures is None:
+                    picture_futures.append((item, _IMAGE_EXECUTOR.submit(build_pictures_list, img_fields, tenant_access_token)))
     
     # 处理飞书多维表格数据
     elif "data" in sheet_data and "items" in sheet_data["data"]:
         records = sheet_data["data"]['items']
+        # 计算过滤日期，所有记录共用
+        filter_date = datetime.datetime.now() - datetime.timedelta(days=WEEKLY_REPORT_FILTER_DAYS)
         
         for record in records:
             # 多维表格数据存储在fields字段中
@@ -445,15 +597,15 @@ def parse_sheet_data(sheet_data: Dict[str, Any], tenant_access_token: str, bitab
             
             # 获取记录ID，用于后续更新记录
             record_id = record.get("record_id", "")
-            print(f"DEBUG: record_id: {record_id}")
+            logger.debug("record_id: %s", record_id)
             
             # 解析字段数据，支持不同的列名映射
-            name = fields.get("名称", fields.get("name", ""))
-            desc = fields.get("描述", fields.get("desc", ""))
+            name = _first(fields, ("名称", "name"))
+            desc = _first(fields, ("描述", "desc"))
             
             # 支持更多可能的URL字段名称
-            url_field = fields.get("URL", fields.get("url", fields.get("链接", fields.get("link", ""))))
-            time_str = fields.get("Time", fields.get("time", ""))
+            url_field = _first(fields, ("URL", "url", "链接", "link"))
+            time_str = _first(fields, ("Time", "time"))
             
             # 解析URL字段，支持超链接类型（对象）和文本类型
             url = ""
@@ -483,14 +635,7 @@ def parse_sheet_data(sheet_data: Dict[str, Any], tenant_access_token: str, bitab
                 try:
                     # 解析时间，支持多种格式
                     if isinstance(time_str, str):
-                        # 尝试不同的时间格式解析
-                        time_formats = ["%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y/%m/%d", "%Y/%m/%d %H:%M:%S"]
-                        for fmt in time_formats:
-                            try:
-                                record_time = datetime.datetime.strptime(time_str.split('T')[0], fmt) if 'T' in time_str else datetime.datetime.strptime(time_str, fmt)
-                                break
-                            except ValueError:
-                                continue
+                        record_time = _parse_time_str(time_str)
                     elif isinstance(time_str, (int, float)):
                         # 处理数字类型的时间戳（毫秒或秒）
                         timestamp = float(time_str)
@@ -501,15 +646,13 @@ def parse_sheet_data(sheet_data: Dict[str, Any], tenant_access_token: str, bitab
                             record_time = datetime.datetime.fromtimestamp(timestamp)
                     
                     if record_time:
-                        # 计算过滤日期
-                        filter_date = datetime.datetime.now() - datetime.timedelta(days=WEEKLY_REPORT_FILTER_DAYS)
                         # 如果记录时间早于过滤日期，则跳过，减少后续不必要的计算
                         if record_time < filter_date:
-                            print(f"DEBUG: Skipping record with time {record_time}, which is before filter date {filter_date}")
+                            logger.debug("Skipping record with time %s, which is before filter date %s", record_time, filter_date)
                             continue
                 except Exception as e:
                     # 如果时间解析失败，不影响记录处理，继续保留
-                    print(f"DEBUG: Failed to parse time_str {time_str}: {e}")
+                    logger.debug("Failed to parse time_str %s: %s", time_str, e)
             
             # 处理图片字段，优先从image_key字段读取值
             # 1. 先检查是否有专门的image_key字段
@@ -520,42 +663,36 @@ def parse_sheet_data(sheet_data: Dict[str, Any], tenant_access_token: str, bitab
             img_field1 = ""
             img_field2 = ""
             if not img_key1:
-                img_field1 = fields.get("image1", fields.get("图片1", fields.get("image", fields.get("附件", fields.get("attachment1", "")))))
+                img_field1 = _first(fields, ("image1", "图片1", "image", "附件", "attachment1"))
             if not img_key2:
-                img_field2 = fields.get("image2", fields.get("图片2", fields.get("附件2", fields.get("attachment2", ""))))
+                img_field2 = _first(fields, ("image2", "图片2", "附件2", "attachment2"))
             
             # 构建pictures列表
-            # 使用专门的image_key字段来存储生成的image_key，而不是尝试更新附件类型字段
-            pictures = build_pictures_list(
-                [img_key1 if img_key1 else img_field1, img_key2 if img_key2 else img_field2], 
-                tenant_access_token, 
-                bitable_token, 
-                table_id, 
-                record_id, 
-                ["image_key1", "image_key2"]  # 使用专门的image_key字段来存储image_key
-            )
-            
-            # 处理换行符，先解码JSON转义序列\n为实际的\n，再转换为<br>标签
-            if desc:
-                # 替换JSON转义的换行符\n为实际换行符
-                desc = desc.replace('\\n', '\n')
-                # 再将实际换行符转换为HTML <br>标签
-                desc = desc.replace('\n', '<br>')
-            
-            # 构建item
-            item = {
-                "name": name,
-                "desc": desc,
-                "pictures": pictures,
-                "url": {
-                    "pc_url": url,
-                    "android_url": url,
-                    "ios_url": url,
-                    "url": url
-                }
-            }
+            # 常见情况下image_key字段在首次运行后已被回填，此时直接构建，不进入线程池
+            img_fields = [img_key1 if img_key1 else img_field1, img_key2 if img_key2 else img_field2]
+            pictures = _resolved_pictures(img_fields)
             
+            # 多维表格的链接同时用于各平台
+            item = _make_item(name, desc, pictures if pictures is not None else [], url, url)
             items.append(item)
+            if pictures is None:
+                # 使用专门的image_key字段来存储生成的image_key，而不是尝试更新附件类型字段
+                picture_futures.append((item, _IMAGE_EXECUTOR.submit(
+                    build_pictures_list,
+                    img_fields, 
+                    tenant_access_token, 
+                    record_id, 
+                    ["image_key1", "image_key2"],  # 使用专门的image_key字段来存储image_key
+                    pending_updates if bitable_token and table_id else None
+                )))
+    
+    # 等待所有图片处理完成，回填到对应的item中
+    for item, future in picture_futures:
+        item["pictures"] = future.result()
+    
+    # 将新获取的image_key批量写回多维表格，下次可直接读取
+    if pending_updates:
+        batch_update_bitable_records(tenant_access_token, bitable_token, table_id, pending_updates)
     
     return items
 
@@ -581,8 +718,9 @@ def get_weekly_report_data(doc_token: Optional[str] = None, spreadsheet_token: O
     
     # 从飞书多维表格获取数据
     if bitable_token and table_id:
-        bitable_content = fetch_bitable_content(tenant_access_token, bitable_token, table_id)
-        items = parse_sheet_data(bitable_content, tenant_access_token, bitable_token, table_id)
+        # 以生成器传入记录，前面分页的图片处理可以与后续分页的请求重叠进行
+        records = iter_bitable_records(tenant_access_token, bitable_token, table_id)
+        items = parse_sheet_data({"data": {"items": records}}, tenant_access_token, bitable_token, table_id)
         common = "本周AI动态速览"  # 默认标题，可从表格或文档获取
         
         return {
@@ -5,10 +5,13 @@
 用于处理飞书事件订阅，包括消息接收事件
 """
 
-import json
-import sys
+import functools
+import logging
+import threading
 import time
-from typing import Dict, Any
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Deque, Dict, Any, List
 
 import lark_oapi as lark
 from lark_oapi.api.im.v1 import *
@@ -16,12 +19,65 @@ from lark_oapi.api.im.v1 import *
 from auth import get_tenant_access_token
 from message import is_message_valid, mark_message_processed
 from llm import llm_request
-from config import BOT_NAME
+from config import BOT_NAME, ARK_MAX_CONCURRENCY
+from json_utils import loads
+
+logger = logging.getLogger(__name__)
 
 # 会话状态管理，用于保存每个session的previous_response_id
 # 键为session_id，值为previous_response_id
 SESSION_STATES = {}
 
+# 问答处理线程池：大模型调用耗时较长，放到后台执行，事件回调立即返回
+# 不同群组的请求可以并发，避免一条慢请求阻塞后续所有事件
+_ANSWER_EXECUTOR = ThreadPoolExecutor(max_workers=ARK_MAX_CONCURRENCY, thread_name_prefix="answer")
+
+# 每个session正在执行任务时，后续任务在此排队，保证previous_response_id串成一条上下文
+# 同一session同一时刻最多只占用线程池的一个线程，不会阻塞其他群组；队列排空后删除该session
+_SESSION_QUEUES: Dict[str, Deque[Callable[[], None]]] = {}
+_SESSION_QUEUES_LOCK = threading.Lock()
+
+
+def _run_session_task(session_id: str, task: Callable[[], None]) -> None:
+    """
+    在线程池中执行session的一个任务，完成后提交该session排队中的下一个任务
+    
+    Args:
+        session_id: 会话ID
+        task: 要执行的任务
+    """
+    try:
+        task()
+    except Exception as e:
+        logger.error("running task for session %s: %s", session_id, e)
+    finally:
+        with _SESSION_QUEUES_LOCK:
+            pending = _SESSION_QUEUES[session_id]
+            if pending:
+                _ANSWER_EXECUTOR.submit(_run_session_task, session_id, pending.popleft())
+            else:
+                del _SESSION_QUEUES[session_id]
+
+
+def submit_session_task(session_id: str, fn: Callable[..., None], *args: Any) -> None:
+    """
+    提交问答任务，同一session的任务按提交顺序依次执行，不同session之间并发
+    
+    Args:
+        session_id: 会话ID
+        fn: 任务函数
+        *args: 任务函数的参数
+    """
+    task = functools.partial(fn, *args)
+    with _SESSION_QUEUES_LOCK:
+        pending = _SESSION_QUEUES.get(session_id)
+        if pending is not None:
+            # 该session已有任务在执行，排队等待
+            pending.append(task)
+            return
+        _SESSION_QUEUES[session_id] = deque()
+    _ANSWER_EXECUTOR.submit(_run_session_task, session_id, task)
+
 
 def call_ai_model(query_text: str, image_inputs: list, session_id: str) -> str:
     """
@@ -35,6 +91,7 @@ def call_ai_model(query_text: str, image_inputs: list, session_id: str) -> str:
     Returns:
         str: 大模型返回的回复内容
     """
+    # 同一session的调用由submit_session_task保证串行执行
     # 获取当前会话的previous_response_id
     previous_response_id = SESSION_STATES.get(session_id)
     
@@ -47,27 +104,69 @@ def call_ai_model(query_text: str, image_inputs: list, session_id: str) -> str:
     
     return ai_response
 
-def do_p2_im_message_receive_v1(data: P2ImMessageReceiveV1) -> None:
+def answer_message(message_id: str, chat_id: str, query_text: str, image_keys: List[str]) -> None:
     """
-    处理接收消息事件
+    获取图片、调用大模型并回复消息，在问答线程池中按群组串行执行
     
     Args:
-        data: 接收消息事件数据
+        message_id: 消息ID
+        chat_id: 群组ID，作为session_id区分不同群组的会话上下文
+        query_text: 去除@标记后的问题文本
+        image_keys: 消息中的图片key列表
     """
-    print(f'[do_p2_im_message_receive_v1 access], data: {lark.JSON.marshal(data, indent=4)}')
-    
     try:
         from config import APP_ID, APP_SECRET
         
         # 获取 tenant_access_token
         tenant_access_token, err = get_tenant_access_token(APP_ID, APP_SECRET)
         if err:
-            print(f"ERROR: getting tenant_access_token: {err}", file=sys.stderr)
+            logger.error("getting tenant_access_token: %s", err)
             return
         
+        # 获取图片base64列表
+        image_base64_list = []
+        if image_keys:
+            from message import get_image_base64
+            for image_key in image_keys:
+                image_base64 = get_image_base64(tenant_access_token, message_id, image_key)
+                if image_base64:
+                    image_base64_list.append(image_base64)
+        
+        # 打印处理的查询内容
+        logger.info("Processing query - Text: %s, Image count: %d", query_text, len(image_base64_list))
+        
+        # 调用大模型处理，分别传递文本和图片base64数据
+        ai_response = call_ai_model(query_text, image_base64_list, chat_id)
+        
+        # 回复消息
+        from message import reply_message
+        reply_result = reply_message(
+            tenant_access_token=tenant_access_token,
+            message_id=message_id,
+            content=ai_response,
+            msg_type="text"
+        )
+        
+        logger.info("Reply sent successfully: %s", reply_result)
+        
+    except Exception as e:
+        logger.error("answering message %s: %s", message_id, e)
+
+def do_p2_im_message_receive_v1(data: P2ImMessageReceiveV1) -> None:
+    """
+    处理接收消息事件
+    
+    Args:
+        data: 接收消息事件数据
+    """
+    # 序列化整个事件开销较大，仅在开启DEBUG日志时执行
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("[do_p2_im_message_receive_v1 access], data: %s", lark.JSON.marshal(data))
+    
+    try:
         event = data.event
         if not event or not event.message:
-            print("ERROR: Invalid event data", file=sys.stderr)
+            logger.error("Invalid event data")
             return
             
         message = event.message
@@ -75,7 +174,7 @@ def do_p2_im_message_receive_v1(data: P2ImMessageReceiveV1) -> None:
         # 检查事件类型，只处理消息创建事件
         event_type = data.header.event_type if hasattr(data.header, 'event_type') else ''
         if event_type != 'im.message.receive_v1':
-            print(f"INFO: Ignoring non-message event: {event_type}")
+            logger.info("Ignoring non-message event: %s", event_type)
             return
         
         # 获取消息时间戳
@@ -95,16 +194,22 @@ def do_p2_im_message_receive_v1(data: P2ImMessageReceiveV1) -> None:
         
         # 只处理群聊中的@消息
         if message.chat_type != "group":
-            print("INFO: Not a group message, ignoring")
+            logger.info("Not a group message, ignoring")
             # 标记为已处理
             mark_message_processed(message.message_id)
             return
 
-        # 检查是否有@当前机器人或文本中包含BOT_NAME
-        bot_mentioned = False
+        # 先用代价低的检查过滤：@列表中是否有机器人，以及原始JSON文本中是否出现BOT_NAME
+        # 两者都不满足时机器人不可能被提及，无需解析消息内容
+        bot_mentioned = any(mention.name == BOT_NAME for mention in message.mentions or [])
+        if not bot_mentioned and (not message.content or BOT_NAME not in message.content):
+            logger.info("Bot not mentioned in message and BOT_NAME not in text, ignoring")
+            # 标记为已处理
+            mark_message_processed(message.message_id)
+            return
 
         # 提取消息内容
-        content = json.loads(message.content) if message.content else {}
+        content = loads(message.content) if message.content else {}
         text_content = ""
         image_keys = []
         
@@ -124,32 +229,18 @@ def do_p2_im_message_receive_v1(data: P2ImMessageReceiveV1) -> None:
                         image_key = item.get("image_key")
                         if image_key:
                             image_keys.append(image_key)
-            
         
-        if not message.mentions and BOT_NAME not in text_content:
-            print("INFO: No mentions in message, ignoring")
-            # 标记为已处理
-            mark_message_processed(message.message_id)
-            return
-        
-
-        if message.mentions:
-            for mention in message.mentions:
-                # 检查是否@了当前机器人
-                if mention.name == BOT_NAME:
-                    bot_mentioned = True
-                    break
         # 如果没有@提及，检查文本中是否包含BOT_NAME
-        elif BOT_NAME in text_content:
+        if not message.mentions and BOT_NAME in text_content:
             bot_mentioned = True
         
         # 如果没有@机器人且文本中也不包含BOT_NAME，直接返回
         if not bot_mentioned:
-            print("INFO: Bot not mentioned in message and BOT_NAME not in text, ignoring")
+            logger.info("Bot not mentioned in message and BOT_NAME not in text, ignoring")
             # 标记为已处理
             mark_message_processed(message.message_id)
             return
-                
+        
         # 清理@标记，只保留问题文本
         query_text = ""
         if isinstance(content, dict) and "text" in content and message.mentions:
@@ -166,37 +257,11 @@ def do_p2_im_message_receive_v1(data: P2ImMessageReceiveV1) -> None:
         #     mark_message_processed(message.message_id)
         #     return
         
-        # 获取图片base64列表
-        image_base64_list = []
-        if image_keys:
-            from message import get_image_base64
-            for image_key in image_keys:
-                image_base64 = get_image_base64(tenant_access_token, message.message_id, image_key)
-                if image_base64:
-                    image_base64_list.append(image_base64)
-        
-        # 打印处理的查询内容
-        print(f"Processing query - Text: {query_text}, Image count: {len(image_base64_list)}")
+        # 提交前先标记消息为已处理，处理期间飞书重推的同一消息会被去重
+        mark_message_processed(message.message_id)
         
         # 使用chat_id作为session_id，为不同群组生成不同的会话上下文
-        session_id = message.chat_id
-        
-        # 调用大模型处理，分别传递文本和图片base64数据
-        ai_response = call_ai_model(query_text, image_base64_list, session_id)
-        
-        # 回复消息
-        from message import reply_message
-        reply_result = reply_message(
-            tenant_access_token=tenant_access_token,
-            message_id=message.message_id,
-            content=ai_response,
-            msg_type="text"
-        )
-        
-        print(f"Reply sent successfully: {json.dumps(reply_result)}")
-        
-        # 标记消息为已处理
-        mark_message_processed(message.message_id)
+        submit_session_task(message.chat_id, answer_message, message.message_id, message.chat_id, query_text, image_keys)
         
     except Exception as e:
-        print(f"ERROR: processing message event: {e}", file=sys.stderr)
\ No newline at end of file
+        logger.error("processing message event: %s", e)
\ No newline at end of file
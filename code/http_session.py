@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP会话模块
+提供共享的requests.Session，复用到飞书开放平台的TCP/TLS连接
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# 429限流和5xx临时错误在连接池层重试，不需要调用方重跑整个周报流程（已上传的图片不会重做）
+# Retry-After响应头优先于指数退避；重试耗尽后返回最后一次响应，由调用方的raise_for_status处理
+# 401/令牌失效不在此重试，由auth.request_with_token清除缓存的token、刷新后重试一次
+_RETRY = Retry(
+    total=5,
+    backoff_factor=0.3,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset(("GET", "PUT", "POST")),
+    respect_retry_after_header=True,
+    raise_on_status=False
+)
+
+# 默认超时：(连接超时, 读取超时)，单位：秒
+REQUEST_TIMEOUT = (3, 10)
+
+# 所有飞书接口共用一个Session，通过keep-alive复用连接，避免每次请求重新握手
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=_RETRY)
+_SESSION.mount("https://", _ADAPTER)
+_SESSION.mount("http://", _ADAPTER)
+
+
+def get_session() -> requests.Session:
+    """
+    获取共享的requests.Session
+
+    Returns:
+        requests.Session: 带连接池的共享会话
+    """
+    return _SESSION
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON工具模块
+优先使用orjson进行序列化/反序列化，未安装时回退到标准库json
+"""
+
+from typing import Any, Union
+
+try:
+    import orjson
+
+    def loads(data: Union[bytes, str]) -> Any:
+        """将JSON字节串或字符串解析为Python对象"""
+        return orjson.loads(data)
+
+    def dumps_bytes(obj: Any) -> bytes:
+        """将Python对象序列化为UTF-8编码的JSON字节串"""
+        return orjson.dumps(obj)
+
+    def dumps(obj: Any) -> str:
+        """将Python对象序列化为JSON字符串（不转义非ASCII字符）"""
+        return orjson.dumps(obj).decode("utf-8")
+
+except ImportError:
+    import json
+
+    def loads(data: Union[bytes, str]) -> Any:
+        """将JSON字节串或字符串解析为Python对象"""
+        return json.loads(data)
+
+    def dumps_bytes(obj: Any) -> bytes:
+        """将Python对象序列化为UTF-8编码的JSON字节串"""
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+    def dumps(obj: Any) -> str:
+        """将Python对象序列化为JSON字符串（不转义非ASCII字符）"""
+        return json.dumps(obj, ensure_ascii=False)
@@ -1,8 +1,9 @@
 # -*- coding: utf-8 -*-
-import os
-from volcenginesdkarkruntime import Ark
+import logging
+import threading
 
-# 从配置文件导入LLM相关配置
+# 从配置文件导入LLM相关配置，ARK_API_KEY首次创建客户端时才通过config读取
+import config
 from config import (
     ARK_BASE_URL,
     ARK_MODEL,
@@ -10,21 +11,111 @@ from config import (
     ARK_TEMPERATURE,
     ARK_TOP_P,
     ARK_REASONING_EFFORT,
-    ARK_SYSTEM_PROMPT
+    ARK_SYSTEM_PROMPT,
+    ARK_MAX_RETRIES
 )
 
+logger = logging.getLogger(__name__)
+
+# 系统提示消息内容固定，模块加载时构建一次，各请求共享（只读，不要修改）
+_SYSTEM_MSG = {
+    "role": "system",
+    "content": ARK_SYSTEM_PROMPT
+}
+
+
+def _input_text(text):
+    """构建多模态输入中的文本内容项
+    """
+    return {"type": "input_text", "text": text}
+
+
+def _input_image(image_data):
+    """构建多模态输入中的图片内容项
+    
+    Args:
+        image_data: base64编码的图片（以"data:"开头）或图片URL
+    """
+    # base64编码的图片直接作为image_url，URL形式的图片包装为{"url": ...}
+    if image_data.startswith("data:"):
+        return {"type": "input_image", "image_url": image_data}
+    return {"type": "input_image", "image_url": {"url": image_data}}
+
+
 # 初始化Ark客户端
 
 def create_ark_client():
     """创建并返回Ark客户端实例
     从环境变量获取API密钥，使用配置文件中的端点
     """
+    # 创建客户端时才导入SDK，只使用响应解析等功能时无需安装SDK
+    from volcenginesdkarkruntime import Ark
     return Ark(
         base_url=ARK_BASE_URL,  # 从配置文件读取API端点
-        api_key=os.environ.get("ARK_API_KEY"),  # 从环境变量读取API密钥
+        api_key=config.ARK_API_KEY,  # 从环境变量读取API密钥，首次创建客户端时才加载.env
+        max_retries=ARK_MAX_RETRIES,  # 临时错误由SDK内部退避重试，不直接返回失败
     )
 
 
+# 进程内共享的Ark客户端，首次使用时创建，后续请求复用其连接池
+# 底层httpx客户端是线程安全的，多个线程可以共用同一个实例
+_ARK_CLIENT = None
+_ARK_CLIENT_LOCK = threading.Lock()
+
+
+def get_ark_client():
+    """获取共享的Ark客户端实例，首次调用时创建
+    """
+    global _ARK_CLIENT
+    if _ARK_CLIENT is None:
+        with _ARK_CLIENT_LOCK:
+            # 双重检查，避免并发首次调用时重复创建客户端
+            if _ARK_CLIENT is None:
+                _ARK_CLIENT = create_ark_client()
+    return _ARK_CLIENT
+
+
+def _parse_output_text(content_item, parts):
+    """解析文本类型的内容项
+    """
+    text = getattr(content_item, 'text', None)
+    if text:
+        parts.append(text)
+
+
+def _parse_output_image(content_item, parts):
+    """解析图片类型的内容项，这里简单拼接URL
+    """
+    url = getattr(content_item, 'url', None)
+    if url:
+        parts.append(f"\n[图片: {url}]")
+
+
+# content类型到解析函数的分发表，新增类型（如音频、工具调用）时在此注册
+_CONTENT_PARSERS = {
+    "output_text": _parse_output_text,
+    "output_image": _parse_output_image,
+}
+
+
+def parse_response_content(response_message):
+    """解析模型返回消息中的content列表，拼接为回复文本
+    
+    Args:
+        response_message: 模型返回的消息，即response.output[0]
+        
+    Returns:
+        str: 回复文本，未注册的content类型会被忽略
+    """
+    # 各部分先收集到列表，最后一次拼接
+    parts = []
+    for content_item in response_message.content:
+        parser = _CONTENT_PARSERS.get(getattr(content_item, 'type', None))
+        if parser:
+            parser(content_item, parts)
+    return "".join(parts)
+
+
 def llm_request(user_input, image_inputs=None, previous_response_id=None):
     """调用LLM API并返回响应内容，使用Responses API的session缓存
     
@@ -36,48 +127,22 @@ def llm_request(user_input, image_inputs=None, previous_response_id=None):
     Returns:
         tuple: (str, str) - AI模型生成的回复内容和当前请求的ID，如果出错则返回(None, None)
     """
-    client = create_ark_client()
+    client = get_ark_client()
     try:
         # 构建输入消息
         input_messages = []
         
         # 对于首次请求，添加系统提示
         if not previous_response_id:
-            input_messages.append({
-                "role": "system",
-                "content": ARK_SYSTEM_PROMPT
-            })
+            input_messages.append(_SYSTEM_MSG)
         
         if image_inputs:
             # 构建多模态输入
             # 参考官方示例：当同时有图片和文本时，content应该是一个列表
             # 包含input_text和input_image类型的对象
-            user_content = []
-            
-            # 添加文本内容（如果有）
-            if user_input:
-                user_content.append({
-                    "type": "input_text",
-                    "text": user_input
-                })
-            
-            # 添加图片内容
-            for image_data in image_inputs:
-                # 检查是否为base64编码的图片（以"data:"开头）
-                if image_data.startswith("data:"):
-                    # 对于base64编码的图片，使用input_image类型和image_url字段
-                    user_content.append({
-                        "type": "input_image",
-                        "image_url": image_data
-                    })
-                else:
-                    # 对于URL形式的图片，同样使用input_image类型和image_url字段
-                    user_content.append({
-                        "type": "input_image",
-                        "image_url": {
-                            "url": image_data
-                        }
-                    })
+            # 文本内容（如果有）在前，图片内容在后
+            user_content = [_input_text(user_input)] if user_input else []
+            user_content += [_input_image(image_data) for image_data in image_inputs]
             
             # 添加用户输入（多模态）
             input_messages.append({
@@ -105,27 +170,13 @@ def llm_request(user_input, image_inputs=None, previous_response_id=None):
         )
         
         # 解析模型生成的内容
-        ai_content = ""
-        response_message = response.output[0]
-        
-        # 遍历content列表，处理不同类型的内容
-        for content_item in response_message.content:
-            # 处理文本类型
-            if hasattr(content_item, 'type') and content_item.type == 'output_text':
-                if hasattr(content_item, 'text'):
-                    ai_content += content_item.text
-            # 处理图片类型（如果有）
-            elif hasattr(content_item, 'type') and content_item.type == 'output_image':
-                if hasattr(content_item, 'url'):
-                    # 图片类型可以根据需要进行处理，这里简单拼接URL
-                    ai_content += f"\n[图片: {content_item.url}]"
-            # 可以添加其他类型的处理
+        ai_content = parse_response_content(response.output[0])
         
         # 返回模型生成的内容和当前请求的ID
         return ai_content, response.id
     except Exception as e:
-        # 异常处理
-        print(f"API调用出错: {e}")
+        # 异常处理，SDK重试耗尽或不可重试的错误才会走到这里
+        logger.error("API调用出错: %s", e)
         return None, None
 
 
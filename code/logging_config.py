@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志配置模块
+日志记录只入队，由后台线程统一写到stderr，避免业务线程在stdout锁和写系统调用上串行
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from typing import Optional
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging() -> None:
+    """
+    配置根日志记录器，重复调用无副作用
+
+    日志级别由环境变量 FEISHU_LOG_LEVEL 指定（默认INFO），FEISHU_DEBUG=1 等同于DEBUG
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    level_name = "DEBUG" if os.environ.get("FEISHU_DEBUG") == "1" else os.environ.get("FEISHU_LOG_LEVEL", "INFO")
+    level = getattr(logging, level_name.upper(), logging.INFO)
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _listener.start()
+    # 退出前停止监听线程，确保队列中的日志全部写出
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
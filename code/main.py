@@ -12,6 +12,10 @@ from lark_oapi.api.im.v1 import *
 # 导入自定义模块
 from config import APP_ID, APP_SECRET
 from event_handler import do_p2_im_message_receive_v1
+from logging_config import setup_logging
+
+# 日志级别由环境变量 FEISHU_LOG_LEVEL 控制，FEISHU_DEBUG=1 时输出请求/响应等调试日志
+setup_logging()
 
 # 事件处理器
 event_handler = lark.EventDispatcherHandler.builder(APP_ID, APP_SECRET) \
@@ -5,6 +5,7 @@
 """
 
 import os
+from logging_config import setup_logging
 from weekly_report import create_weekly_report_card, send_weekly_report_to_groups
 
 # 从环境变量获取测试群组ID
@@ -14,10 +15,7 @@ def test_create_and_send_weekly_report():
     # 1. 测试创建卡片
     print("=== 测试创建卡片 ===")
     
-    # 重新加载card模块以获取最新的卡片数据
-    import importlib
     import card
-    importlib.reload(card)
     
     # 直接查看card_data以了解数据结构
     print(f"DEBUG: card_data: {card.card_data}")
@@ -74,4 +72,5 @@ def test_create_and_send_weekly_report():
         raise
 
 if __name__ == "__main__":
+    setup_logging()
     test_create_and_send_weekly_report()
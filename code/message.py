@@ -5,48 +5,185 @@
 用于处理飞书消息相关的功能
 """
 
+import atexit
+import base64
+import logging
 import os
-import json
-import requests
-import sys
+import threading
 import time
-from typing import Dict, Any, List, Optional, Set
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
 
 import lark_oapi as lark
 from lark_oapi.api.im.v1 import *
-from config import PROCESSED_MESSAGES_FILE, MAX_MESSAGE_AGE, APP_ID, APP_SECRET
+import config
+from config import PROCESSED_MESSAGES_FILE, PROCESSED_MESSAGES_FLUSH_INTERVAL, PROCESSED_MESSAGES_MAX, MAX_MESSAGE_AGE
+from auth import request_with_token
+from json_utils import dumps, dumps_bytes, loads
 
-# 用于消息去重的集合，存储已处理的消息ID
-processed_messages: Set[str] = set()
+logger = logging.getLogger(__name__)
+
+# 飞书SDK客户端，首次使用时创建，所有图片下载请求共用；导入本模块不会读取配置
+_LARK_CLIENT = None
+_LARK_CLIENT_LOCK = threading.Lock()
+
+
+def _get_lark_client() -> lark.Client:
+    """
+    获取共享的飞书SDK客户端，首次调用时创建（构建时不发起网络请求）
+    """
+    global _LARK_CLIENT
+    if _LARK_CLIENT is None:
+        with _LARK_CLIENT_LOCK:
+            # 双重检查，避免并发首次调用时重复创建客户端
+            if _LARK_CLIENT is None:
+                _LARK_CLIENT = lark.Client.builder() \
+                    .app_id(config.APP_ID) \
+                    .app_secret(config.APP_SECRET) \
+                    .log_level(lark.LogLevel.INFO) \
+                    .build()
+    return _LARK_CLIENT
+
+# 用于消息去重，键为已处理的消息ID，值为标记时间戳（秒），按标记时间先后排列
+# 超过MAX_MESSAGE_AGE的消息本身会被is_message_valid拒绝，对应的ID无需继续保留
+processed_messages: "OrderedDict[str, int]" = OrderedDict()
+
+# 持久化文件的长期句柄，写入先进入缓冲区，由后台线程定期刷盘
+_processed_file = None
+_processed_file_dirty = False
+# 持久化文件中的行数，超过PROCESSED_MESSAGES_MAX时重写文件
+_processed_file_lines = 0
+# 保护processed_messages的修改和持久化文件的读写
+_processed_lock = threading.Lock()
+# 持久化文件是否已加载；首次检查或标记消息时才加载，此时日志已完成配置
+_processed_loaded = False
 
 def load_processed_messages() -> None:
     """
     从持久化文件加载已处理的消息ID
     """
-    global processed_messages
+    global _processed_file_lines, _processed_loaded
+    _processed_loaded = True
     if os.path.exists(PROCESSED_MESSAGES_FILE):
         try:
-            with open(PROCESSED_MESSAGES_FILE, "r") as f:
-                for line in f:
-                    msg_id = line.strip()
-                    if msg_id:
-                        processed_messages.add(msg_id)
-            print(f"Loaded {len(processed_messages)} processed messages from file")
+            # 一次读入整个文件并按空白切分，不逐行解码
+            with open(PROCESSED_MESSAGES_FILE, "rb") as f:
+                message_ids = f.read().decode("utf-8").split()
+            _processed_file_lines = len(message_ids)
+            # 文件中没有时间戳，以加载时间作为标记时间，只保留最近的PROCESSED_MESSAGES_MAX条
+            processed_messages.update(dict.fromkeys(message_ids[-PROCESSED_MESSAGES_MAX:], int(time.time())))
+            logger.info("Loaded %s processed messages from file", len(processed_messages))
+        except Exception as e:
+            logger.error("Loading processed messages: %s", e)
+
+def _ensure_processed_messages_loaded() -> None:
+    """
+    首次使用时从持久化文件加载已处理的消息ID，之后直接返回
+    """
+    if not _processed_loaded:
+        with _processed_lock:
+            # 双重检查，避免并发首次调用时重复加载
+            if not _processed_loaded:
+                load_processed_messages()
+
+def _evict_processed_messages(now: int) -> None:
+    """
+    从最早的条目开始淘汰超过数量上限或已过期的消息ID
+    调用方需持有_processed_lock
+    
+    Args:
+        now: 当前时间戳（秒）
+    """
+    expire_before = now - MAX_MESSAGE_AGE
+    while processed_messages:
+        marked_at = next(iter(processed_messages.values()))
+        if len(processed_messages) <= PROCESSED_MESSAGES_MAX and marked_at >= expire_before:
+            break
+        processed_messages.popitem(last=False)
+
+def _get_processed_file():
+    """
+    获取持久化文件句柄，首次调用时打开文件并启动后台刷盘线程
+    调用方需持有_processed_lock
+    """
+    global _processed_file
+    if _processed_file is None:
+        _processed_file = open(PROCESSED_MESSAGES_FILE, "a", buffering=1 << 16)
+        threading.Thread(target=_flush_loop, name="processed-messages-flusher", daemon=True).start()
+        atexit.register(close_processed_messages_file)
+    return _processed_file
+
+def _rotate_processed_file() -> None:
+    """
+    用内存中仍保留的消息ID重写持久化文件，避免文件无限增长
+    调用方需持有_processed_lock
+    """
+    global _processed_file, _processed_file_dirty, _processed_file_lines
+    if _processed_file is not None:
+        _processed_file.close()
+    tmp_path = f"{PROCESSED_MESSAGES_FILE}.tmp"
+    with open(tmp_path, "w") as f:
+        f.writelines(f"{message_id}\n" for message_id in processed_messages)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, PROCESSED_MESSAGES_FILE)
+    _processed_file = open(PROCESSED_MESSAGES_FILE, "a", buffering=1 << 16)
+    _processed_file_dirty = False
+    _processed_file_lines = len(processed_messages)
+
+def flush_processed_messages() -> None:
+    """
+    将缓冲区中的已处理消息ID写入磁盘
+    """
+    global _processed_file_dirty
+    with _processed_lock:
+        if _processed_file is None or not _processed_file_dirty:
+            return
+        try:
+            _processed_file.flush()
+            os.fsync(_processed_file.fileno())
+            _processed_file_dirty = False
         except Exception as e:
-            print(f"ERROR: Loading processed messages: {e}", file=sys.stderr)
+            logger.error("Flushing processed messages: %s", e)
+
+def _flush_loop() -> None:
+    """
+    后台刷盘线程，每隔PROCESSED_MESSAGES_FLUSH_INTERVAL秒刷盘一次
+    """
+    while True:
+        time.sleep(PROCESSED_MESSAGES_FLUSH_INTERVAL)
+        flush_processed_messages()
+
+def close_processed_messages_file() -> None:
+    """
+    刷盘并关闭持久化文件，进程退出时自动调用
+    """
+    global _processed_file
+    flush_processed_messages()
+    with _processed_lock:
+        if _processed_file is not None:
+            _processed_file.close()
+            _processed_file = None
 
 def save_processed_message(message_id: str) -> None:
     """
     将已处理的消息ID保存到持久化文件
+    写入缓冲区后立即返回，由后台线程批量刷盘
     
     Args:
         message_id: 消息ID
     """
+    global _processed_file_dirty, _processed_file_lines
     try:
-        with open(PROCESSED_MESSAGES_FILE, "a") as f:
-            f.write(f"{message_id}\n")
+        with _processed_lock:
+            _get_processed_file().write(f"{message_id}\n")
+            _processed_file_dirty = True
+            _processed_file_lines += 1
+            if _processed_file_lines > PROCESSED_MESSAGES_MAX:
+                _rotate_processed_file()
     except Exception as e:
-        print(f"ERROR: Saving processed message: {e}", file=sys.stderr)
+        logger.error("Saving processed message: %s", e)
 
 def is_message_valid(message_id: str, message_time: int) -> bool:
     """
@@ -60,8 +197,9 @@ def is_message_valid(message_id: str, message_time: int) -> bool:
         bool: 消息是否有效
     """
     # 检查消息是否已经被处理过
+    _ensure_processed_messages_loaded()
     if message_id in processed_messages:
-        print(f"INFO: Message {message_id} already processed, ignoring")
+        logger.info("Message %s already processed, ignoring", message_id)
         return False
     
     # 获取当前时间戳（秒）
@@ -72,7 +210,7 @@ def is_message_valid(message_id: str, message_time: int) -> bool:
     
     # 只处理5分钟内的消息，避免处理历史消息
     if message_age > MAX_MESSAGE_AGE:
-        print(f"INFO: Message {message_id} is too old ({message_age}s > {MAX_MESSAGE_AGE}s), ignoring")
+        logger.info("Message %s is too old (%ds > %ds), ignoring", message_id, message_age, MAX_MESSAGE_AGE)
         return False
     
     return True
@@ -84,7 +222,12 @@ def mark_message_processed(message_id: str) -> None:
     Args:
         message_id: 消息ID
     """
-    processed_messages.add(message_id)
+    _ensure_processed_messages_loaded()
+    now = int(time.time())
+    with _processed_lock:
+        processed_messages[message_id] = now
+        processed_messages.move_to_end(message_id)
+        _evict_processed_messages(now)
     save_processed_message(message_id)
 
 def send_message_to_chat(tenant_access_token: str, chat_id: str, content: str, msg_type: str = "text") -> Dict[str, Any]:
@@ -102,38 +245,43 @@ def send_message_to_chat(tenant_access_token: str, chat_id: str, content: str, m
     """
     url = "https://open.feishu.cn/open-apis/im/v1/messages"
     headers = {
-        "Authorization": f"Bearer {tenant_access_token}",
         "Content-Type": "application/json; charset=utf-8"
     }
     params = {
         "receive_id_type": "chat_id"
     }
     
-    # 构造消息内容
+    # 构造消息内容，飞书API要求content字段是JSON字符串
     if msg_type == "text":
-        msg_content = {"text": content}
+        msg_content = dumps({"text": content})
+    elif isinstance(content, str) and content.startswith('{'):
+        # 已经序列化好的JSON字符串（如预先构建的卡片）直接使用，无需解析后再序列化
+        msg_content = content
     else:
-        msg_content = json.loads(content) if isinstance(content, str) and content.startswith('{') else content
+        msg_content = dumps(content)
     
-    # 飞书API要求content字段是JSON字符串
+    # uuid用于飞书侧去重，连接池层重试POST时不会重复发送消息
     payload = {
         "receive_id": chat_id,
         "msg_type": msg_type,
-        "content": json.dumps(msg_content)
+        "content": msg_content,
+        "uuid": str(uuid.uuid4())
     }
     
     try:
-        print(f"POST: {url} with params: {params}")
-        print(f"Request payload: {json.dumps(payload)}")
-        response = requests.post(url, headers=headers, params=params, json=payload)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("POST: %s with params: %s", url, params)
+            logger.debug("Request payload: %s", payload)
+        # 请求体用orjson序列化一次，不再经过requests内部的标准库json
+        response = request_with_token("POST", url, tenant_access_token, headers=headers, params=params, data=dumps_bytes(payload))
         response.raise_for_status()
         
-        result = response.json()
-        print(f"Response: {json.dumps(result)}")
+        result = loads(response.content)
+        logger.debug("Response: %s", result)
         
         if result.get("code", 0) != 0:
             error_msg = f"failed to send message: {result.get('msg', 'unknown error')}"
-            print(f"ERROR: {error_msg}", file=sys.stderr)
+            logger.error(error_msg)
             raise Exception(error_msg)
             
         return result
@@ -142,9 +290,14 @@ def send_message_to_chat(tenant_access_token: str, chat_id: str, content: str, m
         error_msg = f"Error sending message: {e}"
         if hasattr(e, 'response') and e.response is not None:
             error_msg += f" Response: {e.response.text}"
-        print(f"ERROR: {error_msg}", file=sys.stderr)
+        logger.error(error_msg)
         raise
 
+
+# 图片data URL前缀（Content-Type默认为image/jpeg）
+_IMAGE_DATA_URL_PREFIX_STR = "data:image/jpeg;base64,"
+
+
 def get_image_base64(tenant_access_token: str, message_id: str, image_key: str) -> Optional[str]:
     """
     根据消息ID和图片key获取图片二进制流，并转换为base64编码
@@ -157,16 +310,7 @@ def get_image_base64(tenant_access_token: str, message_id: str, image_key: str)
     Returns:
         Optional[str]: 图片的base64编码字符串，如果获取失败则返回None
     """
-    import base64
-    
     try:
-        # 创建飞书SDK客户端
-        client = lark.Client.builder() \
-            .app_id(APP_ID) \
-            .app_secret(APP_SECRET) \
-            .log_level(lark.LogLevel.DEBUG) \
-            .build()
-        
         # 构造请求对象
         request: GetMessageResourceRequest = GetMessageResourceRequest.builder() \
             .message_id(message_id) \
@@ -175,31 +319,25 @@ def get_image_base64(tenant_access_token: str, message_id: str, image_key: str)
             .build()
         
         # 发起请求
-        response: GetMessageResourceResponse = client.im.v1.message_resource.get(request)
+        response: GetMessageResourceResponse = _get_lark_client().im.v1.message_resource.get(request)
         
         # 处理失败返回
         if not response.success():
             error_msg = f"client.im.v1.message_resource.get failed, code: {response.code}, msg: {response.msg}, log_id: {response.get_log_id()}"
             if hasattr(response, 'raw') and response.raw:
-                error_msg += f", resp: {json.dumps(json.loads(response.raw.content), indent=4, ensure_ascii=False)}"
-            print(f"ERROR: {error_msg}", file=sys.stderr)
+                error_msg += f", resp: {dumps(loads(response.raw.content))}"
+            logger.error(error_msg)
             return None
         
         # 读取图片二进制数据
         image_data = response.file.read()
         
-        # 获取Content-Type（默认为image/jpeg）
-        content_type = "image/jpeg"
-        
-        # 将二进制数据转换为base64编码
-        base64_encoded = base64.b64encode(image_data).decode('utf-8')
-        
-        # 返回带前缀的base64字符串，方便LLM处理
-        return f"data:{content_type};base64,{base64_encoded}"
+        # 将二进制数据转换为base64编码，返回带前缀的base64字符串，方便LLM处理
+        return _IMAGE_DATA_URL_PREFIX_STR + base64.b64encode(image_data).decode('ascii')
             
     except Exception as e:
         error_msg = f"Error getting image data with SDK: {e}"
-        print(f"ERROR: {error_msg}", file=sys.stderr)
+        logger.error(error_msg)
         return None
 
 
@@ -218,33 +356,37 @@ def reply_message(tenant_access_token: str, message_id: str, content: str, msg_t
     """
     url = f"https://open.feishu.cn/open-apis/im/v1/messages/{message_id}/reply"
     headers = {
-        "Authorization": f"Bearer {tenant_access_token}",
         "Content-Type": "application/json; charset=utf-8"
     }
     
-    # 构造消息内容
+    # 构造消息内容，飞书API要求content字段是JSON字符串
     if msg_type == "text":
-        msg_content = {"text": content}
+        msg_content = dumps({"text": content})
+    elif isinstance(content, dict):
+        msg_content = dumps(content)
     else:
-        msg_content = json.loads(content) if isinstance(content, str) and content.startswith('{') else content
+        # 已经序列化好的JSON字符串直接使用，无需解析后再序列化
+        msg_content = content
     
     payload = {
-        "content": json.dumps(msg_content) if isinstance(msg_content, dict) else msg_content,
-        "msg_type": msg_type
+        "content": msg_content,
+        "msg_type": msg_type,
+        "uuid": str(uuid.uuid4())
     }
     
     try:
-        print(f"POST: {url}")
-        print(f"Request payload: {json.dumps(payload)}")
-        response = requests.post(url, headers=headers, json=payload)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("POST: %s", url)
+            logger.debug("Request payload: %s", payload)
+        response = request_with_token("POST", url, tenant_access_token, headers=headers, data=dumps_bytes(payload))
         response.raise_for_status()
         
-        result = response.json()
-        print(f"Response: {json.dumps(result)}")
+        result = loads(response.content)
+        logger.debug("Response: %s", result)
         
         if result.get("code", 0) != 0:
             error_msg = f"failed to reply message: {result.get('msg', 'unknown error')}"
-            print(f"ERROR: {error_msg}", file=sys.stderr)
+            logger.error(error_msg)
             raise Exception(error_msg)
             
         return result
@@ -253,8 +395,5 @@ def reply_message(tenant_access_token: str, message_id: str, content: str, msg_t
         error_msg = f"Error replying message: {e}"
         if hasattr(e, 'response') and e.response is not None:
             error_msg += f" Response: {e.response.text}"
-        print(f"ERROR: {error_msg}", file=sys.stderr)
+        logger.error(error_msg)
         raise
-
-# 初始化时加载已处理的消息ID
-load_processed_messages()
\ No newline at end of file
@@ -4,6 +4,7 @@
 为所有添加机器人的群组发送周报
 """
 
+from logging_config import setup_logging
 from weekly_report import send_weekly_report_to_groups
 
 def seed_all_weekly_report():
@@ -42,4 +43,5 @@ def seed_all_weekly_report():
         raise
 
 if __name__ == "__main__":
+    setup_logging()
     seed_all_weekly_report()
@@ -6,16 +6,19 @@
 """
 
 import json
-import sys
+import logging
 import time
 import copy
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, List, Dict, Any
 
 from auth import get_tenant_access_token
 from chat import get_bot_chats
 from message import send_message_to_chat
-from card import CARD_CONFIG
+from card import build_card_config, build_card_content
+from config import WEEKLY_REPORT_SEND_CONCURRENCY
 
+logger = logging.getLogger(__name__)
 
 
 def create_weekly_report_card(report_content: Any) -> Dict[str, Any]:
@@ -28,24 +31,43 @@ def create_weekly_report_card(report_content: Any) -> Dict[str, Any]:
     Returns:
         Dict[str, Any]: 飞书卡片JSON结构
     """
-    # 重新加载card模块以获取最新的卡片数据
-    import importlib
-    from card import get_card_data, CARD_TEMPLATE_ID, CARD_TEMPLATE_VERSION
-    importlib.reload(sys.modules['card'])
-    
-    # 重新获取卡片数据
-    card_data = get_card_data()
-    
-    # 构建新的卡片配置
-    return {
-        "template_id": CARD_TEMPLATE_ID,
-        "template_version_name": CARD_TEMPLATE_VERSION,
-        "template_variable": {
-            "common": card_data["common"], 
-            "item": card_data["items"]
-        }
-    }
+    # 卡片数据由card模块按CARD_DATA_TTL缓存，过期后自动重新获取，无需重新加载模块
+    return build_card_config()
+
 
+def _send_report_to_chat(tenant_access_token: str, chat_id: str, content: Any, msg_type: str) -> Dict[str, Any]:
+    """
+    向单个群组发送周报，并将结果包装为结果字典
+
+    Args:
+        tenant_access_token: 租户访问令牌
+        chat_id: 群组ID
+        content: 消息内容
+        msg_type: 消息类型
+
+    Returns:
+        Dict[str, Any]: 发送结果
+    """
+    try:
+        result = send_message_to_chat(
+            tenant_access_token=tenant_access_token,
+            chat_id=chat_id,
+            content=content,
+            msg_type=msg_type
+        )
+        logger.info("Successfully sent report to chat %s", chat_id)
+        return {
+            "chat_id": chat_id,
+            "success": True,
+            "result": result
+        }
+    except Exception as e:
+        logger.error("Failed to send report to chat %s: %s", chat_id, e)
+        return {
+            "chat_id": chat_id,
+            "success": False,
+            "error": str(e)
+        }
 
 
 def send_weekly_report_to_groups(report_content: str, target_chat_ids: Optional[List[str]] = None, use_card: bool = True) -> List[Dict[str, Any]]:
@@ -75,55 +97,36 @@ def send_weekly_report_to_groups(report_content: str, target_chat_ids: Optional[
             chats = get_bot_chats(tenant_access_token)
             target_chat_ids = [chat["chat_id"] for chat in chats if chat.get("chat_id")]
         
-        print(f"Sending weekly report to {len(target_chat_ids)} groups: {target_chat_ids}")
+        logger.info("Sending weekly report to %s groups: %s", len(target_chat_ids), target_chat_ids)
+        if not target_chat_ids:
+            return results
+        
+        # 所有群组收到的内容相同，只构建一次
+        if use_card:
+            # 使用飞书卡片格式发送
+            # create_weekly_report_card 现在会自动处理 report_content 是字符串还是结构化数据的情况
+            card = create_weekly_report_card(report_content)
+            # 飞书卡片消息要求content是包含type和data字段的对象，序列化一次后发往所有群组
+            content_to_send = build_card_content(card)
+            msg_type = "interactive"
+        else:
+            # 使用文本格式发送
+            # 如果 report_content 是 list/dict，需要先转为字符串
+            content_to_send = report_content
+            if not isinstance(report_content, str):
+                content_to_send = json.dumps(report_content, ensure_ascii=False, indent=2)
+            msg_type = "text"
         
-        # 向每个群组发送周报
-        for chat_id in target_chat_ids:
-            try:
-                if use_card:
-                    # 使用飞书卡片格式发送
-                    # create_weekly_report_card 现在会自动处理 report_content 是字符串还是结构化数据的情况
-                    card = create_weekly_report_card(report_content)
-                    # 飞书卡片消息要求content是包含type和data字段的对象
-                    card_content = {
-                        "type": "template",
-                        "data": card
-                    }
-                    result = send_message_to_chat(
-                        tenant_access_token=tenant_access_token,
-                        chat_id=chat_id,
-                        content=card_content,
-                        msg_type="interactive"
-                    )
-                else:
-                    # 使用文本格式发送
-                    # 如果 report_content 是 list/dict，需要先转为字符串
-                    content_to_send = report_content
-                    if not isinstance(report_content, str):
-                        content_to_send = json.dumps(report_content, ensure_ascii=False, indent=2)
-                        
-                    result = send_message_to_chat(
-                        tenant_access_token=tenant_access_token,
-                        chat_id=chat_id,
-                        content=content_to_send,
-                        msg_type="text"
-                    )
-                results.append({
-                    "chat_id": chat_id,
-                    "success": True,
-                    "result": result
-                })
-                print(f"Successfully sent report to chat {chat_id}")
-            except Exception as e:
-                results.append({
-                    "chat_id": chat_id,
-                    "success": False,
-                    "error": str(e)
-                })
-                print(f"Failed to send report to chat {chat_id}: {e}", file=sys.stderr)
+        # 并发向每个群组发送周报，发送是I/O密集型操作，线程在等待网络时会释放GIL
+        max_workers = min(WEEKLY_REPORT_SEND_CONCURRENCY, len(target_chat_ids))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(
+                lambda chat_id: _send_report_to_chat(tenant_access_token, chat_id, content_to_send, msg_type),
+                target_chat_ids
+            ))
                 
     except Exception as e:
-        print(f"ERROR: sending weekly report: {e}", file=sys.stderr)
+        logger.error("sending weekly report: %s", e)
         raise
         
     return results
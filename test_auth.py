@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试tenant_access_token失效后的刷新与重试
+"""
+
+import os
+import sys
+import time
+
+# 添加代码目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'code'))
+
+import auth
+from mock_utils import MockResponse, patched
+
+_TOKEN_URL = "https://open.feishu.cn/open-apis/auth/v3/tenant_access_token/internal"
+_API_URL = "https://open.feishu.cn/open-apis/im/v1/chats"
+
+# 使用固定的测试凭证，不依赖.env
+_KEY = ("cli_test", "test_secret")
+
+
+# 模拟requests的会话
+class MockSession:
+    def __init__(self, error_status=400, error_code=99991663):
+        self.error_status = error_status
+        self.error_code = error_code
+        self.api_tokens = []
+        self.token_requests = 0
+
+    def post(self, url, **kwargs):
+        assert url == _TOKEN_URL
+        self.token_requests += 1
+        return MockResponse(200, {"code": 0, "tenant_access_token": "t-new", "expire": 7200})
+
+    def request(self, method, url, headers=None, **kwargs):
+        token = headers["Authorization"][len("Bearer "):]
+        self.api_tokens.append(token)
+        if token == "t-old":
+            return MockResponse(self.error_status, {"code": self.error_code, "msg": "error"})
+        return MockResponse(200, {"code": 0, "data": {}})
+
+def _patched_auth(cached_token, session=None):
+    """替换测试凭证、token缓存和共享会话，缓存中只放入指定token，退出时恢复"""
+    return patched(auth, _DEFAULT_CREDENTIALS=(_KEY, None),
+                   _TOKEN_CACHE={_KEY: (cached_token, time.monotonic() + 7200)},
+                   get_session=lambda: session)
+
+def test_retry_on_invalid_token():
+    """令牌失效时清除缓存、刷新令牌并重试一次"""
+    for status, code in ((400, 99991663), (400, 99991668), (401, 0)):
+        session = MockSession(status, code)
+        with _patched_auth("t-old", session):
+            response = auth.request_with_token("GET", _API_URL, "t-old")
+            assert auth._TOKEN_CACHE[_KEY][0] == "t-new"
+
+        assert response.status_code == 200
+        assert session.api_tokens == ["t-old", "t-new"]
+        assert session.token_requests == 1
+    print("✓ 令牌失效重试测试通过")
+
+def test_no_retry_on_other_errors():
+    """其他错误不刷新令牌，原样返回给调用方"""
+    session = MockSession(400, 1254001)
+    with _patched_auth("t-old", session):
+        response = auth.request_with_token("GET", _API_URL, "t-old")
+        assert auth._TOKEN_CACHE[_KEY][0] == "t-old"
+
+    assert response.status_code == 400
+    assert session.api_tokens == ["t-old"]
+    assert session.token_requests == 0
+    print("✓ 非令牌错误不重试测试通过")
+
+def test_invalidate_keeps_refreshed_token():
+    """并发时其他线程已刷新的token不会被旧token的失效操作清除"""
+    with _patched_auth("t-new"):
+        auth.invalidate_token(stale_token="t-old")
+        assert auth._TOKEN_CACHE[_KEY][0] == "t-new"
+
+        auth.invalidate_token(stale_token="t-new")
+        assert _KEY not in auth._TOKEN_CACHE
+    print("✓ 令牌失效条件清除测试通过")
+
+if __name__ == "__main__":
+    print("开始测试令牌刷新...")
+    test_retry_on_invalid_token()
+    test_no_retry_on_other_errors()
+    test_invalidate_keeps_refreshed_token()
+    print("\n所有测试通过！")
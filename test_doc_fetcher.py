@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试多维表格数据处理
+"""
+
+import contextlib
+import json
+import os
+import sys
+import threading
+
+# 添加代码目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'code'))
+
+import doc_fetcher
+from mock_utils import MockResponse, patched
+
+
+def _patched_request(payloads):
+    """替换doc_fetcher的请求函数，记录每次请求的请求体，退出时恢复"""
+    def mock_request(method, url, tenant_access_token, headers=None, data=None, **kwargs):
+        payloads.append(json.loads(data))
+        return MockResponse(200, {"code": 0, "data": {}})
+
+    return patched(doc_fetcher, request_with_token=mock_request)
+
+def test_batch_update_merges_fields():
+    """同一记录的多个字段合并为一条记录，同一字段以最后一次写入为准"""
+    payloads = []
+    updates = [
+        ("rec_1", "img_a", "key_a1"),
+        ("rec_2", "img_a", "key_b1"),
+        ("rec_1", "img_b", "key_a2"),
+        ("rec_1", "img_a", "key_a3"),
+    ]
+
+    with _patched_request(payloads):
+        assert doc_fetcher.batch_update_bitable_records("t", "bitable", "table", updates)
+
+    assert len(payloads) == 1
+    records = {record["record_id"]: record["fields"] for record in payloads[0]["records"]}
+    assert records == {
+        "rec_1": {"img_a": "key_a3", "img_b": "key_a2"},
+        "rec_2": {"img_a": "key_b1"},
+    }
+    print("✓ 批量更新字段合并测试通过")
+
+def test_batch_update_splits_requests():
+    """超过单次请求上限的记录拆分为多次请求"""
+    payloads = []
+    limit = doc_fetcher._BATCH_UPDATE_LIMIT
+    updates = [(f"rec_{i}", "img", f"key_{i}") for i in range(limit + 1)]
+
+    with _patched_request(payloads):
+        assert doc_fetcher.batch_update_bitable_records("t", "bitable", "table", updates)
+
+    assert [len(payload["records"]) for payload in payloads] == [limit, 1]
+    print("✓ 批量更新分批请求测试通过")
+
+@contextlib.contextmanager
+def _patched_fetch(mock_fetch):
+    """替换图片下载上传函数并清空image_key缓存，退出时恢复函数、清空测试写入的缓存"""
+    doc_fetcher._IMAGE_KEY_CACHE.clear()
+    try:
+        with patched(doc_fetcher, _fetch_image_key=mock_fetch):
+            yield
+    finally:
+        doc_fetcher._IMAGE_KEY_CACHE.clear()
+
+def test_image_key_dedupes_in_flight_requests():
+    """并发请求同一file_token时只下载上传一次，其余调用等待同一结果"""
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def mock_fetch(tenant_access_token, file_token):
+        calls.append(file_token)
+        started.set()
+        release.wait(5)
+        return f"key_{file_token}"
+
+    results = []
+    with _patched_fetch(mock_fetch):
+        threads = [threading.Thread(target=lambda: results.append(doc_fetcher.get_image_key("t", "file_1"))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        assert started.wait(5)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+    assert calls == ["file_1"]
+    assert results == ["key_file_1"] * 8
+    print("✓ 图片key并发去重测试通过")
+
+def test_image_key_failure_is_not_cached():
+    """获取失败时移除缓存中的Future，下次调用重新请求"""
+    calls = []
+
+    def mock_fetch(tenant_access_token, file_token):
+        calls.append(file_token)
+        if len(calls) == 1:
+            raise Exception("upload failed")
+        return f"key_{file_token}"
+
+    with _patched_fetch(mock_fetch):
+        try:
+            doc_fetcher.get_image_key("t", "file_1")
+            assert False, "第一次调用应抛出异常"
+        except Exception as e:
+            assert str(e) == "upload failed"
+        assert "file_1" not in doc_fetcher._IMAGE_KEY_CACHE
+
+        assert doc_fetcher.get_image_key("t", "file_1") == "key_file_1"
+        assert doc_fetcher.get_image_key("t", "file_1") == "key_file_1"
+    assert calls == ["file_1", "file_1"]
+    print("✓ 图片key失败重试测试通过")
+
+def test_image_key_cache_is_bounded():
+    """缓存条目数不超过上限，超出时淘汰最早加入的条目"""
+    size = doc_fetcher._IMAGE_KEY_CACHE_SIZE
+
+    with _patched_fetch(lambda tenant_access_token, file_token: f"key_{file_token}"):
+        for i in range(size + 1):
+            doc_fetcher.get_image_key("t", f"file_{i}")
+
+        assert len(doc_fetcher._IMAGE_KEY_CACHE) == size
+        assert "file_0" not in doc_fetcher._IMAGE_KEY_CACHE
+        assert f"file_{size}" in doc_fetcher._IMAGE_KEY_CACHE
+    print("✓ 图片key缓存上限测试通过")
+
+if __name__ == "__main__":
+    print("开始测试多维表格数据处理...")
+    test_batch_update_merges_fields()
+    test_batch_update_splits_requests()
+    test_image_key_dedupes_in_flight_requests()
+    test_image_key_failure_is_not_cached()
+    test_image_key_cache_is_bounded()
+    print("\n所有测试通过！")
@@ -4,6 +4,14 @@
 测试LLM返回值解析
 """
 
+import os
+import sys
+
+# 添加代码目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'code'))
+
+from llm import parse_response_content
+
 # 模拟API响应结构
 class MockResponseContent:
     def __init__(self, content_type, text=None, url=None):
@@ -33,13 +41,7 @@ def test_text_only():
     mock_response = MockResponse(mock_content, 'test_id_123')
     
     # 测试解析逻辑
-    ai_content = ""
-    response_message = mock_response.output[0]
-    
-    for content_item in response_message.content:
-        if hasattr(content_item, 'type') and content_item.type == 'output_text':
-            if hasattr(content_item, 'text'):
-                ai_content += content_item.text
+    ai_content = parse_response_content(mock_response.output[0])
     
     print(f"文本解析结果: {ai_content}")
     assert ai_content == '你好呀，今天有啥新鲜事儿？这是第二部分内容'
@@ -55,16 +57,7 @@ def test_text_with_image():
     mock_response = MockResponse(mock_content, 'test_id_456')
     
     # 测试解析逻辑
-    ai_content = ""
-    response_message = mock_response.output[0]
-    
-    for content_item in response_message.content:
-        if hasattr(content_item, 'type') and content_item.type == 'output_text':
-            if hasattr(content_item, 'text'):
-                ai_content += content_item.text
-        elif hasattr(content_item, 'type') and content_item.type == 'output_image':
-            if hasattr(content_item, 'url'):
-                ai_content += f"\n[图片: {content_item.url}]"
+    ai_content = parse_response_content(mock_response.output[0])
     
     print(f"文本+图片解析结果: {ai_content}")
     assert ai_content == '这是一段文本内容，附带一张图片：\n[图片: https://example.com/image.jpg]'
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试已处理消息ID的去重与持久化
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# 添加代码目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'code'))
+
+import message
+
+# 测试中手动刷盘，后台刷盘线程不参与
+message.PROCESSED_MESSAGES_FLUSH_INTERVAL = 3600
+
+
+def _reset(path):
+    """关闭持久化文件并清空内存状态，改用指定的持久化文件"""
+    message.close_processed_messages_file()
+    message.processed_messages.clear()
+    message._processed_file_lines = 0
+    message.PROCESSED_MESSAGES_FILE = path
+
+def _restart(path):
+    """模拟进程重启：刷盘关闭文件，清空内存后重新从文件加载"""
+    _reset(path)
+    message.load_processed_messages()
+
+def _read_ids(path):
+    with open(path) as f:
+        return f.read().split()
+
+def test_processed_message_survives_restart():
+    """重启前处理过的消息在重启后仍被跳过，写入在刷盘前停留在缓冲区"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "processed_messages.json")
+        _reset(path)
+        now = int(time.time())
+
+        message.mark_message_processed("om_1")
+        message.mark_message_processed("om_2")
+        # 写入先进入缓冲区，刷盘后才出现在文件中
+        assert _read_ids(path) == []
+        message.flush_processed_messages()
+        assert _read_ids(path) == ["om_1", "om_2"]
+
+        _restart(path)
+
+        assert not message.is_message_valid("om_1", now)
+        assert not message.is_message_valid("om_2", now)
+        assert message.is_message_valid("om_3", now)
+        _reset(path)
+    print("✓ 重启后消息去重测试通过")
+
+def test_rotation_keeps_recent_ids():
+    """持久化文件超过上限时重写为内存中最近的消息ID"""
+    original_max = message.PROCESSED_MESSAGES_MAX
+    message.PROCESSED_MESSAGES_MAX = 3
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "processed_messages.json")
+            _reset(path)
+            now = int(time.time())
+
+            for i in range(5):
+                message.mark_message_processed(f"om_{i}")
+
+            assert list(message.processed_messages) == ["om_2", "om_3", "om_4"]
+            message.flush_processed_messages()
+            assert _read_ids(path) == ["om_2", "om_3", "om_4"]
+
+            _restart(path)
+
+            assert list(message.processed_messages) == ["om_2", "om_3", "om_4"]
+            assert not message.is_message_valid("om_4", now)
+            _reset(path)
+    finally:
+        message.PROCESSED_MESSAGES_MAX = original_max
+    print("✓ 持久化文件轮转测试通过")
+
+def test_expired_ids_are_evicted():
+    """超过MAX_MESSAGE_AGE的消息ID在标记新消息时被淘汰"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "processed_messages.json")
+        _reset(path)
+        now = int(time.time())
+
+        message.processed_messages["om_old"] = now - message.MAX_MESSAGE_AGE - 1
+        message.mark_message_processed("om_new")
+
+        assert list(message.processed_messages) == ["om_new"]
+        _reset(path)
+    print("✓ 过期消息ID淘汰测试通过")
+
+if __name__ == "__main__":
+    print("开始测试已处理消息去重...")
+    test_processed_message_survives_restart()
+    test_rotation_keeps_recent_ids()
+    test_expired_ids_are_evicted()
+    print("\n所有测试通过！")
@@ -4,171 +4,191 @@
 测试多模态消息处理
 """
 
+import contextlib
 import json
+import re
 import sys
 
 # 添加代码目录到路径
 sys.path.append('/Users/bytedance/AI/csm_ai/code')
 
+# 打印用的带缩进JSON序列化，优先使用orjson
+try:
+    import orjson
+
+    def _dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj, indent=2, ensure_ascii=False)
+
+# 通过 -v 参数运行时才打印完整的JSON数据
+VERBOSE = "-v" in sys.argv
+
+# 图片URL中的全角标点统一替换为半角
+_URL_TRANS = str.maketrans({"，": ",", "｀": "`"})
+# 图片URL之间的分隔符：逗号、空白和反引号
+_URL_SEP = re.compile(r"[\s,`]+")
+
+# 模拟飞书消息数据，包含@机器人和图片
+_MOCK_MESSAGE_CONTENT = {
+    "title": "",
+    "content": [
+        [
+            {
+                "tag": "at",
+                "user_id": "@_user_1",
+                "user_name": "CSM-AI",
+                "style": []
+            },
+            {
+                "tag": "text",
+                "text": "  帮我分析一下图片是什么",
+                "style": []
+            }
+        ],
+        [
+            {
+                "tag": "img",
+                "image_key": "img_v3_02sj_bfddac5d-275b-4e06-9050-69d5faaaab8g",
+                "width": 204,
+                "height": 162
+            }
+        ]
+    ]
+}
+
+# 包含图片URL的多模态输入及其预期解析结果
+_MULTIMODAL_INPUT = "帮我分析一下图片是什么\n图片URL: https://black-neo.tos-cn-beijing.volces.com/screenshot-20251118-153229.png，\n https://black-neo.tos-cn-beijing.volces.com/screenshot-20251118-153229.png"
+_EXPECTED_TEXT = "帮我分析一下图片是什么"
+_EXPECTED_URLS = (
+    "https://black-neo.tos-cn-beijing.volces.com/screenshot-20251118-153229.png",
+    "https://black-neo.tos-cn-beijing.volces.com/screenshot-20251118-153229.png"
+)
+
+
+@contextlib.contextmanager
+def _batched_output():
+    """收集测试过程中的输出，结束时（包括断言失败时）一次性写到stdout"""
+    output = []
+    try:
+        yield output
+    finally:
+        sys.stdout.write("\n".join(output) + "\n")
+        sys.stdout.flush()
+
+
+def _collect_text(item, text_parts, image_keys):
+    """处理文本标签"""
+    text_parts.append(item.get("text", ""))
+
+
+def _collect_image(item, text_parts, image_keys):
+    """处理图片标签"""
+    image_key = item.get("image_key")
+    if image_key:
+        image_keys.append(image_key)
+
+
+def _skip_item(item, text_parts, image_keys):
+    """忽略其他标签（如@）"""
+
+
+# 消息元素按tag分发到对应的处理函数
+_TAG_HANDLERS = {
+    "text": _collect_text,
+    "img": _collect_image
+}
+
 # 模拟飞书事件数据
 def test_message_content_parsing():
     """测试消息内容解析逻辑"""
-    # 模拟飞书消息数据，包含@机器人和图片
-    mock_message_content = {
-        "title": "",
-        "content": [
-            [
-                {
-                    "tag": "at",
-                    "user_id": "@_user_1",
-                    "user_name": "CSM-AI",
-                    "style": []
-                },
-                {
-                    "tag": "text",
-                    "text": "  帮我分析一下图片是什么",
-                    "style": []
-                }
-            ],
-            [
-                {
-                    "tag": "img",
-                    "image_key": "img_v3_02sj_bfddac5d-275b-4e06-9050-69d5faaaab8g",
-                    "width": 204,
-                    "height": 162
-                }
-            ]
-        ]
-    }
-    
-    print("\n测试消息内容解析...")
-    print("原始消息内容:", json.dumps(mock_message_content, indent=2))
-    
-    # 测试解析逻辑
-    text_content = ""
-    image_keys = []
-    
-    # 处理结构化消息内容，支持文本和图片
-    if isinstance(mock_message_content, dict) and "content" in mock_message_content:
-        # 遍历content中的每一行
-        for line in mock_message_content["content"]:
-            # 遍历行中的每个元素
-            for item in line:
-                # 处理文本标签
-                if item.get("tag") == "text":
-                    text_content += item.get("text", "")
-                # 处理图片标签
-                elif item.get("tag") == "img":
-                    image_key = item.get("image_key")
-                    if image_key:
-                        image_keys.append(image_key)
-    
-    print(f"解析出的文本: '{text_content}'")
-    print(f"解析出的图片key: {image_keys}")
-    
-    # 验证解析结果
-    assert text_content.strip() == "帮我分析一下图片是什么"
-    assert len(image_keys) == 1
-    assert image_keys[0] == "img_v3_02sj_bfddac5d-275b-4e06-9050-69d5faaaab8g"
-    
-    print("✓ 消息内容解析测试通过")
-    return True
+    with _batched_output() as output:
+        mock_message_content = _MOCK_MESSAGE_CONTENT
+        
+        output.append("\n测试消息内容解析...")
+        if VERBOSE:
+            output.append(f"原始消息内容: {_dumps(mock_message_content)}")
+        
+        # 测试解析逻辑
+        text_content = ""
+        image_keys = []
+        
+        # 处理结构化消息内容，支持文本和图片
+        if isinstance(mock_message_content, dict) and "content" in mock_message_content:
+            text_parts = []
+            # 遍历content中的每一行及行中的每个元素，按tag查表分发
+            for line in mock_message_content["content"]:
+                for item in line:
+                    _TAG_HANDLERS.get(item.get("tag"), _skip_item)(item, text_parts, image_keys)
+            # 文本一次性拼接，避免逐个+=
+            text_content = "".join(text_parts)
+        
+        output.append(f"解析出的文本: '{text_content}'")
+        output.append(f"解析出的图片key: {image_keys}")
+        
+        # 验证解析结果
+        assert text_content.strip() == "帮我分析一下图片是什么"
+        assert len(image_keys) == 1
+        assert image_keys[0] == "img_v3_02sj_bfddac5d-275b-4e06-9050-69d5faaaab8g"
+        
+        output.append("✓ 消息内容解析测试通过")
 
 def test_llm_input_construction():
     """测试LLM输入构建逻辑"""
-    from llm import llm_request
-    
-    print("\n测试LLM输入构建...")
-    
-    # 测试纯文本输入
-    text_input = "帮我分析一下这个问题"
-    print(f"纯文本输入: '{text_input}'")
-    
-    # 测试包含图片URL的输入
-    multimodal_input = "帮我分析一下图片是什么\n图片URL: https://black-neo.tos-cn-beijing.volces.com/screenshot-20251118-153229.png，\n https://black-neo.tos-cn-beijing.volces.com/screenshot-20251118-153229.png"
-    print(f"多模态输入: '{multimodal_input}'")
-    
-    # 测试解析逻辑
-    has_images = "图片URL:" in multimodal_input
-    assert has_images == True
-    
-    # 分离文本和图片URL
-    text_part = ""
-    image_urls = []
-    is_image_url_section = False
-    urls_part = ""
-    
-    # 分割输入，提取图片URL
-    lines = multimodal_input.split("\n")
-    for line in lines:
-        line = line.strip()
-        if line.startswith("图片URL:"):
-            is_image_url_section = True
-            # 提取当前行的图片URL部分
-            urls_part += line.replace("图片URL:", "").strip() + " "
-        elif is_image_url_section:
-            # 如果是图片URL部分的后续行，直接添加
-            urls_part += line + " "
-        else:
-            # 普通文本行
-            if line:
-                text_part += line + "\n"
-    
-    text_part = text_part.strip()
-    
-    # 处理URL部分，支持中英文逗号分隔
-    if urls_part:
-        # 替换中文逗号为英文逗号
-        urls_part = urls_part.replace("，", ",")
-        # 分割URL列表并清理
-        raw_urls = urls_part.split(",")
-        for url in raw_urls:
-            # 清理URL中的多余空格和反引号
-            clean_url = url.strip().strip("`")
-            if clean_url:
-                image_urls.append(clean_url)
-    
-    print(f"分离后的文本: '{text_part}'")
-    print(f"提取的图片URL: {image_urls}")
-    
-    # 更新断言，使用正确的预期结果
-    expected_text = "帮我分析一下图片是什么"
-    expected_urls = [
-        "https://black-neo.tos-cn-beijing.volces.com/screenshot-20251118-153229.png",
-        "https://black-neo.tos-cn-beijing.volces.com/screenshot-20251118-153229.png"
-    ]
-    
-    assert text_part == expected_text, f"预期文本: '{expected_text}', 实际文本: '{text_part}'"
-    assert len(image_urls) == len(expected_urls), f"预期图片URL数量: {len(expected_urls)}, 实际数量: {len(image_urls)}"
-    assert image_urls == expected_urls, f"预期图片URL: {expected_urls}, 实际URL: {image_urls}"
-    
-    # 构建多模态输入内容（与官方示例格式一致）
-    user_content = []
-    
-    # 添加文本内容
-    if text_part:
-        user_content.append({
-            "type": "input_text",
-            "text": text_part
-        })
-    
-    # 添加图片内容
-    for url in image_urls:
-        user_content.append({
-            "type": "input_image",
-            "image_url": url
-        })
-    
-    print(f"构建的多模态内容: {json.dumps(user_content, indent=2)}")
-    
-    assert len(user_content) == 3  # 1个文本 + 2个图片
-    assert user_content[0]["type"] == "input_text"
-    assert user_content[1]["type"] == "input_image"
-    assert user_content[2]["type"] == "input_image"
-    
-    print("✓ LLM输入构建测试通过")
-    return True
-
+    with _batched_output() as output:
+        output.append("\n测试LLM输入构建...")
+        
+        # 测试纯文本输入
+        text_input = "帮我分析一下这个问题"
+        output.append(f"纯文本输入: '{text_input}'")
+        
+        # 测试包含图片URL的输入
+        multimodal_input = _MULTIMODAL_INPUT
+        output.append(f"多模态输入: '{multimodal_input}'")
+        
+        # 测试解析逻辑
+        has_images = "图片URL:" in multimodal_input
+        assert has_images == True
+        
+        # 分离文本和图片URL：标记之前为文本，之后（含后续行）均为图片URL
+        image_urls = ()
+        text_part, _, urls_part = multimodal_input.partition("图片URL:")
+        text_part = text_part.strip()
+        
+        # 处理URL部分，支持中英文逗号分隔
+        if urls_part:
+            # 替换中文逗号、全角反引号为半角，一次遍历完成
+            urls_part = urls_part.translate(_URL_TRANS)
+            # 分割URL列表，同时去掉多余的空格和反引号
+            image_urls = tuple(url for url in _URL_SEP.split(urls_part) if url)
+        
+        output.append(f"分离后的文本: '{text_part}'")
+        output.append(f"提取的图片URL: {image_urls}")
+        
+        # 更新断言，使用正确的预期结果
+        expected_text = _EXPECTED_TEXT
+        expected_urls = _EXPECTED_URLS
+        
+        assert text_part == expected_text, f"预期文本: '{expected_text}', 实际文本: '{text_part}'"
+        assert len(image_urls) == len(expected_urls), f"预期图片URL数量: {len(expected_urls)}, 实际数量: {len(image_urls)}"
+        assert image_urls == expected_urls, f"预期图片URL: {expected_urls}, 实际URL: {image_urls}"
+        
+        # 构建多模态输入内容（与官方示例格式一致）：文本内容在前，图片内容在后
+        user_content = ([{"type": "input_text", "text": text_part}] if text_part else []) + \
+            [{"type": "input_image", "image_url": url} for url in image_urls]
+        
+        if VERBOSE:
+            output.append(f"构建的多模态内容: {_dumps(user_content)}")
+        
+        assert len(user_content) == 3  # 1个文本 + 2个图片
+        assert user_content[0]["type"] == "input_text"
+        assert user_content[1]["type"] == "input_image"
+        assert user_content[2]["type"] == "input_image"
+        
+        output.append("✓ LLM输入构建测试通过")
+        
 if __name__ == "__main__":
     print("开始测试多模态消息处理...")
     test_message_content_parsing()